@@ -0,0 +1,56 @@
+import sys
+import json
+import argparse
+import urllib.request
+
+# ---------------------------
+# Batch question client for /ask_batch
+# ---------------------------
+# Sends a file of questions (one per line, or stdin) to a running backend
+# and writes the NDJSON results as they arrive. Large files are split into
+# batches of at most --batch-size questions.
+#
+#   python ask_batch.py fleet_questions.txt --url http://localhost:8000 > answers.ndjson
+
+
+def ask_batch(url: str, questions, timeout: float = 600):
+    """Yield one result dict per question as the server finishes it"""
+    body = json.dumps({"questions": questions}).encode("utf-8")
+    req = urllib.request.Request(f"{url}/ask_batch", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as res:
+        for line in res:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer many questions through /ask_batch")
+    parser.add_argument("questions", nargs="?", help="file with one question per line (default: stdin)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--batch-size", type=int, default=1000, help="questions per request (server limit: BATCH_MAX_QUESTIONS)")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = [line.strip() for line in sys.stdin if line.strip()]
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    errors = 0
+    try:
+        for offset in range(0, len(questions), args.batch_size):
+            for result in ask_batch(args.url, questions[offset:offset + args.batch_size]):
+                result["index"] += offset
+                if "duplicate_of" in result:
+                    result["duplicate_of"] += offset
+                errors += "error" in result
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"{len(questions)} questions, {errors} errors", file=sys.stderr)
+    sys.exit(1 if errors else 0)
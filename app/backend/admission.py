@@ -0,0 +1,160 @@
+import re
+import math
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTIONS
+
+# ---------------------------
+# Admission control for model calls
+# ---------------------------
+# Every generation call takes a slot: at most `max_concurrent` calls run at
+# once, and a token bucket keeps the start rate within the Bedrock quota.
+# Waiting calls are served by lane (safety before interactive before batch),
+# first come first served within a lane. A call that would wait longer than
+# `max_wait_seconds`, or finds `max_queue` calls ahead of it, is refused
+# right away with AdmissionRejected (429 + Retry-After) instead of tying up a
+# worker thread until it times out. Work that only helps a call which has to
+# wait (retrieval prefetch) is started from `on_queued`, after those checks.
+
+LANES = ("safety", "interactive", "batch")
+
+# Questions about warning lights and failing safety systems take the safety lane
+SAFETY_WORDS = {
+    "warning", "light", "lights", "lamp", "indicator", "dashboard", "flashing", "blinking",
+    "brake", "brakes", "braking", "overheat", "overheating", "smoke", "smoking", "burning",
+    "leak", "leaking", "airbag", "airbags", "srs", "steering", "abs", "esp", "stall", "stalled",
+}
+
+
+def question_lane(question: str):
+    tokens = set(re.sub(r"[^\w\s]", " ", question.lower()).split())
+    return "safety" if tokens & SAFETY_WORDS else "interactive"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: float):
+        super().__init__(f"model capacity exhausted ({reason}), retry in {retry_after:.0f}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`; not locked, callers serialize access"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float):
+        """Take one token; returns 0, or the seconds until one is available (nothing taken)"""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = 16, requests_per_minute: float = 0, burst: float = 10,
+                 max_queue: int = 32, max_wait_seconds: float = 10):
+        self.max_concurrent = max_concurrent
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.waiting = []  # heap of (lane priority, arrival number)
+        self.in_flight = 0
+        self.arrivals = itertools.count()
+        self.cond = threading.Condition()
+
+    def _expected_wait(self, ahead: int):
+        """Seconds until a call with `ahead` calls queued before it gets a rate token (0 without a rate limit)"""
+        return ahead / self.bucket.rate if self.bucket.rate > 0 else 0.0
+
+    def _reject(self, lane: str, reason: str, ahead: int):
+        ADMISSION_REJECTIONS.inc(lane=lane, reason=reason)
+        raise AdmissionRejected(lane, reason, max(1.0, math.ceil(self._expected_wait(ahead + 1))))
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        for priority, lane in enumerate(LANES):
+            ADMISSION_QUEUED.set(sum(1 for p, _ in self.waiting if p == priority), lane=lane)
+
+    def acquire(self, lane: str, on_queued=None):
+        """Take a slot in `lane`; on_queued() is called once if the call has to wait for it"""
+        priority = LANES.index(lane)
+        deadline = time.monotonic() + self.max_wait_seconds
+        with self.cond:
+            # Only calls in the same or a more urgent lane are served first
+            ahead = sum(1 for p, _ in self.waiting if p <= priority)
+            if ahead >= self.max_queue:
+                self._reject(lane, "queue_full", ahead)
+            if self._expected_wait(ahead) > self.max_wait_seconds:
+                self._reject(lane, "wait_too_long", ahead)
+
+            entry = (priority, next(self.arrivals))
+            heapq.heappush(self.waiting, entry)
+            self._update_gauges()
+            queued = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self.waiting[0] == entry and self.in_flight < self.max_concurrent:
+                        delay = self.bucket.take(now)
+                        if delay == 0:
+                            heapq.heappop(self.waiting)
+                            self.in_flight += 1
+                            return
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._reject(lane, "timeout", sum(1 for e in self.waiting if e < entry))
+                    if not queued and on_queued is not None:
+                        # Run the hook without the lock so it can't stall other callers,
+                        # then re-check the queue, which may have moved meanwhile
+                        queued = True
+                        self.cond.release()
+                        try:
+                            on_queued()
+                        finally:
+                            self.cond.acquire()
+                        continue
+                    self.cond.wait(min(remaining, delay) if delay else remaining)
+            finally:
+                if entry in self.waiting:
+                    self.waiting.remove(entry)
+                    heapq.heapify(self.waiting)
+                self._update_gauges()
+                # The head of the queue may have changed
+                self.cond.notify_all()
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self._update_gauges()
+            self.cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane: str):
+        """Hold one generation slot for the duration of the block"""
+        self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                "in_flight": self.in_flight,
+                "queued": {lane: sum(1 for p, _ in self.waiting if p == i) for i, lane in enumerate(LANES)},
+            }
@@ -0,0 +1,115 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------------------
+# Answer cache
+# ---------------------------
+# Exact-match LRU/TTL cache keyed on the normalized question, with an optional
+# embedding-similarity lookup so near-duplicate wordings hit the same answer.
+# Semantic hits must name the same vehicle as the cached question, since
+# "torque 2016 Mazda 3" and "torque 2020 Mazda 3" embed almost identically.
+
+
+def normalize_question(question: str):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+class Embedder:
+    """sentence-transformers encoder for the semantic lookup, loaded by the startup warm-up"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = None
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name)
+        return self
+
+    def embed(self, texts):
+        return self.model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.92, embed_fn=None, vehicle_fn=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self.vehicle_fn = vehicle_fn  # question -> {"make", "model", "year"}
+        self.entries = OrderedDict()  # key -> (expires_at, answer, vector, vehicle)
+        self.lock = threading.Lock()
+
+    def _embed(self, key: str):
+        if self.embed_fn is None:
+            return None
+        vectors = self.embed_fn([key])
+        if vectors is None:
+            return None
+        return np.asarray(vectors[0], dtype="float32")
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, (expires_at, _, _, _) in self.entries.items() if expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+
+    def get(self, question: str):
+        """Return the cached answer for question, or None on a miss"""
+        key = normalize_question(question)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self.entries[key]
+
+        vector = self._embed(key)
+        if vector is None:
+            return None
+        vehicle = self._vehicle(question)
+
+        with self.lock:
+            self._evict_expired(now)
+            best_key, best_score = None, self.similarity_threshold
+            for other_key, (_, _, other_vector, other_vehicle) in self.entries.items():
+                if other_vector is None or other_vehicle != vehicle:
+                    continue
+                score = float(np.dot(vector, other_vector))
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is None:
+                return None
+            self.entries.move_to_end(best_key)
+            return self.entries[best_key][1]
+
+    def _vehicle(self, question: str):
+        return self.vehicle_fn(question) if self.vehicle_fn is not None else None
+
+    def put(self, question: str, answer):
+        key = normalize_question(question)
+        vector = self._embed(key)
+        vehicle = self._vehicle(question) if vector is not None else None
+
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl_seconds, answer, vector, vehicle)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,6 +1,12 @@
 import os
-from flask import Flask, request, jsonify, render_template
-import boto3
+import json
+import time
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
 from dotenv import load_dotenv
 
 # ---------------------------
@@ -14,20 +20,206 @@ load_dotenv(env_path)
 # Env config
 # ---------------------------
 REGION = os.environ.get("REGION", "us-east-1")
-KB_ID = os.environ.get("KB_ID")
-DS_ID = os.environ.get("DS_ID")
-S3_BUCKET = os.environ.get("S3_BUCKET")
+
+# Provider: "aws" (boto3 clients) or "local" (offline stand-ins for benchmarking and tests)
+PROVIDER = os.environ.get("PROVIDER", "aws").lower()
+LOCAL_LATENCY_MS = float(os.environ.get("LOCAL_LATENCY_MS", "500"))
+LOCAL_TOKEN_LATENCY_MS = float(os.environ.get("LOCAL_TOKEN_LATENCY_MS", "20"))
+LOCAL_RETRIEVE_LATENCY_MS = float(os.environ.get("LOCAL_RETRIEVE_LATENCY_MS", "100"))
+LOCAL_INGESTION_SECONDS = float(os.environ.get("LOCAL_INGESTION_SECONDS", "2"))
+
+default_id = "local" if PROVIDER == "local" else None
+KB_ID = os.environ.get("KB_ID", default_id)
+DS_ID = os.environ.get("DS_ID", default_id)
+S3_BUCKET = os.environ.get("S3_BUCKET", default_id)
+
+# Retrieval engine:
+#   "bedrock"  - Knowledge Base retrieve_and_generate (Bedrock picks the context)
+#   "retrieve" - Knowledge Base retrieve, context assembled here, then converse
+#   "local"    - local embedding/BM25 index, context assembled here, then converse
+RETRIEVAL_ENGINE = os.environ.get("RETRIEVAL_ENGINE", "bedrock").lower()
+MODEL_ID = os.environ.get("MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
+# Model routing: simple lookups go to a small fast model, MODEL_ID serves the "complex" route.
+# MODEL_ROUTES is a JSON string or file overriding the route table (model, input_per_1k, output_per_1k).
+# Routing is off (everything uses MODEL_ID) unless MODEL_ROUTES is set or MODEL_ROUTING_ENABLED=true.
+MODEL_ROUTES = os.environ.get("MODEL_ROUTES")
+MODEL_ROUTING_ENABLED = os.environ.get("MODEL_ROUTING_ENABLED", "true" if MODEL_ROUTES else "false").lower() == "true"
+KB_LOCAL_DIR = os.environ.get("KB_LOCAL_DIR", os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'knowledge_base'))
+INDEX_DIR = os.environ.get("INDEX_DIR", os.path.join(os.path.dirname(__file__), '..', 'index'))
+# With PROVIDER=aws, the local engine mirrors objects under this S3 prefix into KB_LOCAL_DIR before each refresh
+KB_S3_PREFIX = os.environ.get("KB_S3_PREFIX", "KB/")
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Storage type of the memory-mapped local embeddings: "float16" or "int8"
+EMBED_DTYPE = os.environ.get("EMBED_DTYPE", "float16").lower()
+TOP_K = int(os.environ.get("TOP_K", "5"))
+
+# Context assembly ("retrieve" and "local" engines): candidates are reranked,
+# deduplicated and packed into the token budget (at most TOP_K passages)
+RETRIEVE_CANDIDATES = int(os.environ.get("RETRIEVE_CANDIDATES", "20"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Retrieval for those engines: questions mixing intents (spec / warning / manual) also retrieve
+# RETRIEVE_SUBQUERY_CANDIDATES passages per intent, concurrently with the main retrieval. Results
+# are cached per normalized query (RETRIEVAL_CACHE_MAX_ENTRIES=0 disables the cache), and
+# retrieval is prefetched while a request waits for its model slot.
+RETRIEVAL_SPLIT_INTENTS = os.environ.get("RETRIEVAL_SPLIT_INTENTS", "true").lower() == "true"
+RETRIEVE_SUBQUERY_CANDIDATES = int(os.environ.get("RETRIEVE_SUBQUERY_CANDIDATES", "8"))
+RETRIEVAL_WORKERS = int(os.environ.get("RETRIEVAL_WORKERS", "16"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.environ.get("RETRIEVAL_CACHE_MAX_ENTRIES", "2048"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.environ.get("RETRIEVAL_CACHE_TTL_SECONDS", "900"))
+RETRIEVAL_PREFETCH = os.environ.get("RETRIEVAL_PREFETCH", "true").lower() == "true"
+
+# Restrict retrieval to the make/model/year mentioned in the question
+VEHICLE_FILTER_ENABLED = os.environ.get("VEHICLE_FILTER_ENABLED", "true").lower() == "true"
+
+# Conversational sessions: follow-ups reuse the vehicle and the Bedrock session of earlier turns
+SESSIONS_ENABLED = os.environ.get("SESSIONS_ENABLED", "true").lower() == "true"
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "10000"))
+
+# Structured fast path (warning lights + tire pressure)
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true"
+# Columnar spec table compiled by data/preprocess.py
+SPEC_TABLE_PATH = os.environ.get("SPEC_TABLE_PATH", os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'build', 'specs_table.json'))
+
+# Warning-light images: a perceptual-hash match at or above WARNING_ICON_MIN_CONFIDENCE that leads the
+# runner-up by WARNING_ICON_MIN_MARGIN is answered directly; otherwise the model looks at the image
+WARNING_ICONS_ENABLED = os.environ.get("WARNING_ICONS_ENABLED", "true").lower() == "true"
+WARNING_ICON_MIN_CONFIDENCE = float(os.environ.get("WARNING_ICON_MIN_CONFIDENCE", "0.5"))
+WARNING_ICON_MIN_MARGIN = float(os.environ.get("WARNING_ICON_MIN_MARGIN", "0.2"))
+WARNING_ICON_MODEL_FALLBACK = os.environ.get("WARNING_ICON_MODEL_FALLBACK", "true").lower() == "true"
+
+# Answer cache
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "3600"))
+CACHE_SEMANTIC = os.environ.get("CACHE_SEMANTIC", "false").lower() == "true"
+CACHE_SIMILARITY_THRESHOLD = float(os.environ.get("CACHE_SIMILARITY_THRESHOLD", "0.92"))
+
+# /ask_batch: questions per request, concurrent model calls per batch, retries on throttling
+BATCH_MAX_QUESTIONS = int(os.environ.get("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_RETRIES = int(os.environ.get("BATCH_MAX_RETRIES", "5"))
+
+# Ingestion scheduling
+INGESTION_DEBOUNCE_SECONDS = float(os.environ.get("INGESTION_DEBOUNCE_SECONDS", "10"))
+INGESTION_POLL_SECONDS = float(os.environ.get("INGESTION_POLL_SECONDS", "5"))
+INGESTION_MAX_POLL_SECONDS = float(os.environ.get("INGESTION_MAX_POLL_SECONDS", "60"))
+# How often each worker checks Bedrock for ingestion jobs completed elsewhere (0 disables)
+INGESTION_WATCH_SECONDS = float(os.environ.get("INGESTION_WATCH_SECONDS", "10"))
+# /ingest_events streams are closed after this long (the browser's EventSource reconnects after
+# INGEST_EVENTS_RETRY_MS), so open dashboards do not each hold a request thread for the whole job
+INGEST_EVENTS_MAX_SECONDS = float(os.environ.get("INGEST_EVENTS_MAX_SECONDS", "25"))
+INGEST_EVENTS_RETRY_MS = int(os.environ.get("INGEST_EVENTS_RETRY_MS", "1000"))
+
+# /upload: files above the multipart threshold are sent in parallel parts; UPLOAD_WORKERS files
+# upload concurrently per process. UPLOAD_MAX_REQUEST_MB bounds the whole request body (413 above it).
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "8"))
+UPLOAD_MAX_FILE_MB = float(os.environ.get("UPLOAD_MAX_FILE_MB", "50"))
+UPLOAD_MAX_REQUEST_MB = float(os.environ.get("UPLOAD_MAX_REQUEST_MB", "500"))
+UPLOAD_MULTIPART_THRESHOLD_MB = float(os.environ.get("UPLOAD_MULTIPART_THRESHOLD_MB", "8"))
+UPLOAD_PART_CONCURRENCY = int(os.environ.get("UPLOAD_PART_CONCURRENCY", "4"))
+
+# /folders index refresh interval
+FOLDERS_TTL_SECONDS = float(os.environ.get("FOLDERS_TTL_SECONDS", "300"))
+
+# Serving: keep the AWS connection pool at least as large as the request thread pool
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", os.environ.get("WEB_THREADS", "32")))
+# AWS retries (adaptive mode) and timeouts; generation calls get the longer BEDROCK_READ_TIMEOUT
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "4"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "30"))
+BEDROCK_READ_TIMEOUT = float(os.environ.get("BEDROCK_READ_TIMEOUT", "120"))
+# Circuit breaker: after BREAKER_THRESHOLD throttles/timeouts within BREAKER_WINDOW_SECONDS, model
+# calls are refused with a 503 for BREAKER_COOLDOWN_SECONDS (fast-path and cached answers still work)
+BREAKER_THRESHOLD = int(os.environ.get("BREAKER_THRESHOLD", "5"))
+BREAKER_WINDOW_SECONDS = float(os.environ.get("BREAKER_WINDOW_SECONDS", "30"))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("BREAKER_COOLDOWN_SECONDS", "15"))
+# Admission control for model calls (per worker process): at most ADMISSION_MAX_CONCURRENT calls at once,
+# started at no more than ADMISSION_REQUESTS_PER_MINUTE (0 = unlimited; set to the Bedrock quota divided
+# by WEB_WORKERS) with bursts of ADMISSION_BURST. Safety questions are served first, batch questions last.
+# Calls that find ADMISSION_MAX_QUEUE calls ahead or would wait over ADMISSION_MAX_WAIT_SECONDS get a 429.
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_REQUESTS_PER_MINUTE = float(os.environ.get("ADMISSION_REQUESTS_PER_MINUTE", "0"))
+ADMISSION_BURST = float(os.environ.get("ADMISSION_BURST", "10"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "12"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", "10"))
+FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "false").lower() == "true"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "info")
 
 # Validate required environment variables
 if not all([KB_ID, DS_ID, S3_BUCKET]):
     raise ValueError("Missing required environment variables. Please check your .env file.")
 
+# ---------------------------
+# Logging and metrics (JSON log lines, Prometheus registry served on /metrics)
+# ---------------------------
+from metrics import REQUEST_SECONDS, TOKENS, cache_result, render_metrics, setup_logging, span
+
+setup_logging(LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
 # ---------------------------
 # AWS clients
 # ---------------------------
-s3 = boto3.client("s3", region_name=REGION)
-agent_runtime = boto3.client("bedrock-agent-runtime", region_name=REGION)
-agent_client = boto3.client("bedrock-agent", region_name=REGION)
+from aws_clients import CircuitBreaker, CircuitOpenError, is_overload, make_aws_clients
+
+if PROVIDER == "local":
+    from local_provider import make_local_clients
+
+    s3, agent_runtime, agent_client, bedrock_runtime = make_local_clients(
+        KB_LOCAL_DIR,
+        latency=LOCAL_LATENCY_MS / 1000,
+        token_latency=LOCAL_TOKEN_LATENCY_MS / 1000,
+        ingestion_seconds=LOCAL_INGESTION_SECONDS,
+        retrieve_latency=LOCAL_RETRIEVE_LATENCY_MS / 1000
+    )
+else:
+    # boto3 clients are thread-safe; one shared client per service serves every request thread
+    s3, agent_runtime, agent_client, bedrock_runtime = make_aws_clients(
+        REGION,
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        max_attempts=AWS_MAX_ATTEMPTS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        generation_read_timeout=BEDROCK_READ_TIMEOUT
+    )
+
+bedrock_breaker = CircuitBreaker("bedrock", BREAKER_THRESHOLD, BREAKER_WINDOW_SECONDS, BREAKER_COOLDOWN_SECONDS)
+
+# ---------------------------
+# Admission control: bounded, rate-limited, prioritized model calls; overflow is shed with 429
+# ---------------------------
+from admission import AdmissionController, AdmissionRejected, question_lane
+
+admission = None
+if ADMISSION_ENABLED:
+    admission = AdmissionController(
+        ADMISSION_MAX_CONCURRENT, ADMISSION_REQUESTS_PER_MINUTE, ADMISSION_BURST,
+        ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT_SECONDS
+    )
+
+
+def reserve_generation(lane: str, on_queued=None):
+    """
+    Take a generation slot in `lane` (AdmissionRejected when over capacity); returns its release
+    function. on_queued() runs only if the request passed the admission checks and has to wait.
+    """
+    if admission is None:
+        return lambda: None
+    with span("admission.wait"):
+        admission.acquire(lane, on_queued)
+    return admission.release
+
+
+@contextmanager
+def generation_slot(lane: str, on_queued=None):
+    release = reserve_generation(lane, on_queued)
+    try:
+        yield
+    finally:
+        release()
 
 # ---------------------------
 # Flask
@@ -38,6 +230,9 @@ template_dir = os.path.join(frontend_dir, 'templates')
 static_dir = os.path.join(frontend_dir, 'static')
 
 app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
+# Werkzeug spools uploaded files above 500 KB to temporary files, so large
+# manuals are never held in memory; this caps the total request body size.
+app.config["MAX_CONTENT_LENGTH"] = int(UPLOAD_MAX_REQUEST_MB * 1024 * 1024)
 
 # ---------------------------
 # Load system prompt from file
@@ -54,6 +249,302 @@ def load_system_prompt():
 
 SYSTEM_PROMPT = load_system_prompt()
 
+# ---------------------------
+# Warm-up: heavy components load in the background; /ready reports when they are done
+# ---------------------------
+from readiness import Readiness
+
+readiness = Readiness()
+warmup_steps = []
+
+# ---------------------------
+# Local retrieval engine (optional)
+# ---------------------------
+local_retriever = None
+if RETRIEVAL_ENGINE == "local":
+    from local_retriever import LocalRetriever
+
+    # The local provider's S3 already is KB_LOCAL_DIR, so only real buckets are mirrored
+    s3_source = (s3, S3_BUCKET, KB_S3_PREFIX) if PROVIDER != "local" else None
+    local_retriever = LocalRetriever(KB_LOCAL_DIR, INDEX_DIR, EMBED_MODEL, EMBED_DTYPE, s3_source)
+    warmup_steps.append(("local_index", local_retriever.load_or_build))
+
+# ---------------------------
+# Context assembly (reranker loads lazily on first use; RERANK_MODEL="" disables reranking)
+# ---------------------------
+from context_builder import Reranker, build_context, estimate_tokens
+
+reranker = Reranker(RERANK_MODEL)
+if RETRIEVAL_ENGINE != "bedrock" and RERANK_MODEL:
+    warmup_steps.append(("reranker", reranker.load))
+
+# ---------------------------
+# Vehicle query parser (make/model/year vocabulary from the KB tree)
+# ---------------------------
+from vehicle_query import VehicleParser, bedrock_filter, category_filter, contextual_question, merge_vehicle, vehicle_label
+
+vehicle_parser = VehicleParser(KB_LOCAL_DIR).build()
+
+# ---------------------------
+# Conversational sessions (optional)
+# ---------------------------
+session_store = None
+if SESSIONS_ENABLED:
+    from sessions import SessionStore
+
+    session_store = SessionStore(SESSION_MAX, SESSION_TTL_SECONDS)
+
+
+def open_turn(data: dict, question: str):
+    """
+    (session or None, question in context) for an /ask or /ask_stream body. The session
+    vehicle fills in whatever make/model/year the question leaves out, so "and the rear
+    tires?" is answered, cached and retrieved for the vehicle of the earlier turns.
+    """
+    if session_store is None:
+        return None, question
+    session = session_store.get(data.get("session_id"))
+    parsed = vehicle_parser.parse(question)
+    # Sessions are per worker: a follow-up that lands on another worker continues
+    # from the vehicle the client echoes back
+    context = session.vehicle if session.vehicle.get("make") else client_vehicle(data.get("vehicle"))
+    vehicle = merge_vehicle(context, parsed)
+    if vehicle.get("make"):
+        session.vehicle = vehicle
+    return session, contextual_question(question, parsed, vehicle)
+
+
+def client_vehicle(value):
+    """Vehicle sent back by the client, normalized through the parser (unknown makes/models are dropped)"""
+    if not isinstance(value, dict):
+        return {}
+    return vehicle_parser.parse(vehicle_label({
+        part: value[part] for part in ("year", "make", "model") if isinstance(value.get(part), str)
+    }))
+
+
+def turn_fields(session):
+    """Response fields that let the client continue the conversation on any worker"""
+    if session is None:
+        return {}
+    return {"session_id": session.id, "vehicle": session.vehicle}
+
+
+def shares_cache(session):
+    """
+    Turns continuing a Bedrock conversation are answered from its history, so they
+    neither read nor fill the answer cache shared by all users
+    """
+    return session is None or session.bedrock_session_id is None
+
+# ---------------------------
+# Structured fast-path lookup (built once at startup)
+# ---------------------------
+fast_lookup = None
+if FAST_PATH_ENABLED:
+    from fast_lookup import FastLookup
+
+    fast_lookup = FastLookup(KB_LOCAL_DIR).build()
+
+spec_table = None
+if FAST_PATH_ENABLED:
+    from spec_lookup import SpecTable
+
+    spec_table = SpecTable(SPEC_TABLE_PATH).load()
+
+# ---------------------------
+# Warning-light icon index (hashes precomputed into INDEX_DIR by prebuild.py)
+# ---------------------------
+icon_index = None
+if WARNING_ICONS_ENABLED:
+    from warning_icons import IconIndex, bedrock_image, open_image
+
+    icon_index = IconIndex(KB_LOCAL_DIR, INDEX_DIR).load_or_build()
+
+
+# ---------------------------
+# Model router (route table + per-route latency/cost stats)
+# ---------------------------
+from model_router import ModelRouter, load_routes
+
+known_phrases = []
+if fast_lookup is not None:
+    known_phrases += [" ".join(phrase) for phrase in fast_lookup.phrases]
+if spec_table is not None:
+    known_phrases += [field for rows in spec_table.rows.values() for _, field, _ in rows]
+model_router = ModelRouter(load_routes(MODEL_ROUTES, MODEL_ID), known_phrases)
+
+
+def pick_model(question: str):
+    """Return (route_name, model_id); everything takes the "complex" route when routing is off"""
+    if not MODEL_ROUTING_ENABLED:
+        return "complex", model_router.routes["complex"]["model"]
+    return model_router.route(question)
+
+
+def model_arn(model_id: str):
+    # Inference profiles and provisioned models are passed as full ARNs
+    if model_id.startswith("arn:"):
+        return model_id
+    return f"arn:aws:bedrock:{REGION}::foundation-model/{model_id}"
+
+
+def record_usage(route: str, start: float, input_tokens: int, output_tokens: int, estimated: bool = False):
+    """Per-route stats and token counters; estimated counts are labelled apart from measured converse usage"""
+    model_router.record(route, time.perf_counter() - start, input_tokens, output_tokens, estimated)
+    label = "true" if estimated else "false"
+    TOKENS.inc(input_tokens, route=route, direction="input", estimated=label)
+    TOKENS.inc(output_tokens, route=route, direction="output", estimated=label)
+
+
+def kb_prompt_tokens(question: str, references):
+    """
+    Estimated input tokens of a retrieve_and_generate call: our prompt template plus the
+    retrieved passages Bedrock reports in its citations (passages it did not cite are not reported)
+    """
+    passages = {r.get("content", {}).get("text", "") for r in references}
+    return estimate_tokens(SYSTEM_PROMPT + question + "".join(passages))
+
+
+def fast_answer(question: str):
+    """Direct answer from the structured datasets, or None to fall back to RAG"""
+    if fast_lookup is None and spec_table is None:
+        return None
+    direct = None
+    with span("fast_path"):
+        if fast_lookup is not None:
+            direct = fast_lookup.answer(question)
+        if direct is None and spec_table is not None:
+            direct = spec_table.answer(question, vehicle_parser.parse(question))
+    cache_result("fast_path", direct is not None)
+    return direct
+
+
+def cached_answer(question: str):
+    """Answer cache lookup, or None on a miss (or when the cache is disabled)"""
+    if answer_cache is None:
+        return None
+    with span("cache.get"):
+        cached = answer_cache.get(question)
+    cache_result("answer", cached is not None)
+    return cached
+
+# ---------------------------
+# Folder tree index for /folders (loaded on first request)
+# ---------------------------
+from folder_index import FolderIndex
+
+folder_index = FolderIndex(s3, S3_BUCKET, FOLDERS_TTL_SECONDS)
+
+# ---------------------------
+# Answer cache (optional)
+# ---------------------------
+answer_cache = None
+if CACHE_ENABLED:
+    from answer_cache import AnswerCache, Embedder
+
+    embed_fn = None
+    if CACHE_SEMANTIC:
+        if local_retriever is not None:
+            embed_model = local_retriever
+        else:
+            embed_model = Embedder(EMBED_MODEL)
+            warmup_steps.append(("cache_embedder", embed_model.load))
+
+        # Exact-match only until the embedding model is loaded
+        embed_fn = lambda texts: embed_model.embed(texts) if embed_model.model is not None else None
+
+    answer_cache = AnswerCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_SIMILARITY_THRESHOLD, embed_fn,
+                               vehicle_fn=vehicle_parser.parse)
+
+readiness.start(warmup_steps)
+
+
+# ---------------------------
+# Ingestion scheduler: coalesces uploads into one job and drops cached answers when it completes
+# ---------------------------
+from ingestion_scheduler import IngestionScheduler
+
+
+def on_ingestion_complete(job_id: str):
+    if local_retriever is not None and readiness.ready:
+        # Re-embeds only the files that changed; searches keep using the old snapshot until the swap
+        local_retriever.refresh()
+    if answer_cache is not None:
+        answer_cache.clear()
+        logger.info("answer cache cleared", extra={"fields": {"job_id": job_id}})
+    if retrieval_cache is not None:
+        retrieval_cache.clear()
+
+
+ingestion = IngestionScheduler(
+    agent_client, KB_ID, DS_ID,
+    debounce_seconds=INGESTION_DEBOUNCE_SECONDS,
+    poll_seconds=INGESTION_POLL_SECONDS,
+    max_poll_seconds=INGESTION_MAX_POLL_SECONDS,
+    on_complete=on_ingestion_complete
+)
+# Jobs polled by another worker process (or replica) clear this worker's caches too
+if INGESTION_WATCH_SECONDS > 0:
+    ingestion.watch(INGESTION_WATCH_SECONDS)
+
+# ---------------------------
+# Request timing: one histogram sample and one JSON log line (with the span breakdown) per request
+# ---------------------------
+@app.before_request
+def start_timer():
+    g.start = time.perf_counter()
+    g.spans = {}
+
+
+@app.after_request
+def record_request(response):
+    # For streamed responses this is time to headers; the log line is written once the body is sent
+    start, spans = g.start, g.spans
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        endpoint=request.endpoint or "unknown", method=request.method, status=response.status_code
+    )
+    fields = {"method": request.method, "path": request.path, "status": response.status_code}
+
+    def log_request():
+        fields["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        fields["spans"] = spans
+        logger.info("request", extra={"fields": fields})
+
+    response.call_on_close(log_request)
+    return response
+
+
+@app.errorhandler(CircuitOpenError)
+@app.errorhandler(ClientError)
+@app.errorhandler(BotoCoreError)
+def aws_error(e):
+    """Overloaded Bedrock (open circuit, throttling left after retries, timeouts) -> 503 + Retry-After"""
+    if not isinstance(e, CircuitOpenError) and not is_overload(e):
+        logger.exception("AWS call failed")
+        return jsonify({"error": str(e)}), 502
+    retry_after = getattr(e, "retry_after", None) or max(bedrock_breaker.retry_after(), 1.0)
+    return jsonify({"error": str(e), "retry_after": round(retry_after)}), 503, {"Retry-After": str(round(retry_after))}
+
+
+@app.errorhandler(AdmissionRejected)
+def over_capacity(e):
+    """Model calls shed by admission control -> 429 + Retry-After, before any Bedrock call is made"""
+    return jsonify({"error": str(e), "retry_after": round(e.retry_after)}), 429, {"Retry-After": str(round(e.retry_after))}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once every warm-up step has loaded, 503 before that"""
+    snapshot = readiness.snapshot()
+    return jsonify(snapshot), 200 if snapshot["ready"] else 503
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 # ---------------------------
 # Page
 # ---------------------------
@@ -65,82 +556,130 @@ def index():
 
 @app.post("/ingest")
 def ingest():
-    job = agent_client.start_ingestion_job(
-        knowledgeBaseId=KB_ID,
-        dataSourceId=DS_ID
-    )
-    return jsonify({"jobId": job["ingestionJob"]["ingestionJobId"]})
+    # Starts right away unless a job is already running, in which case one follow-up is queued
+    return jsonify(ingestion.request(immediate=True))
 
 @app.get("/ingest_status")
 def ingest_status():
     job_id = request.args.get("jobId")
     if not job_id:
-        return jsonify({"error": "missing jobId"}), 400
+        return jsonify(ingestion.state())
 
     try:
-        res = agent_client.get_ingestion_job(
-            knowledgeBaseId=KB_ID,
-            dataSourceId=DS_ID,
-            ingestionJobId=job_id
-        )
+        return jsonify({"status": ingestion.job_status(job_id)})
+    except Exception as e:
+        logger.warning("ingestion status check failed", extra={"fields": {"job_id": job_id, "error": str(e)}})
+        return jsonify({"status": "ERROR", "detail": str(e)})
 
-        print("INGESTION STATUS RAW:", res)
+@app.get("/ingest_events")
+def ingest_events():
+    """
+    Push scheduler state changes over SSE until the job completes, fails or is stopped, then send a
+    final "done" event. While this worker knows no job (IDLE) the stream only sends "status" events.
+    Streams end after INGEST_EVENTS_MAX_SECONDS; EventSource reconnects and gets the current state first.
+    """
+    job_id = request.args.get("jobId")
+    if job_id:
+        try:
+            ingestion.track(job_id)
+        except Exception as e:
+            logger.warning("ingestion status check failed", extra={"fields": {"job_id": job_id, "error": str(e)}})
 
-        status = res["ingestionJob"]["status"]
-        return jsonify({"status": status})
+    def events():
+        yield f"retry: {INGEST_EVENTS_RETRY_MS}\n\n"
+        deadline = time.monotonic() + INGEST_EVENTS_MAX_SECONDS
+        version = None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            new_version, state = ingestion.wait_for_change(version, timeout=min(15, remaining))
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            if ingestion.is_settled(state):
+                yield sse("done", state)
+                return
+            yield sse("status", state)
 
-    except Exception as e:
-        print("ERROR IN STATUS CHECK:", str(e))
-        return jsonify({"status": "ERROR", "detail": str(e)})
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ---------------------------
 # API: upload file to selected folder
 # ---------------------------
+upload_transfer_config = TransferConfig(
+    multipart_threshold=int(UPLOAD_MULTIPART_THRESHOLD_MB * 1024 * 1024),
+    multipart_chunksize=int(UPLOAD_MULTIPART_THRESHOLD_MB * 1024 * 1024),
+    max_concurrency=UPLOAD_PART_CONCURRENCY
+)
+# Shared by every request, so concurrent uploads from several users stay bounded too
+upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+def file_size(f):
+    stream = f.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def upload_one(f, key: str):
+    """Upload one file to S3; returns its per-file result instead of raising"""
+    try:
+        with span("s3.upload_file"):
+            s3.upload_fileobj(f.stream, S3_BUCKET, key, ExtraArgs={"ContentType": "text/plain"},
+                              Config=upload_transfer_config)
+    except Exception as e:
+        logger.warning("upload failed", extra={"fields": {"key": key, "error": str(e)}})
+        return {"file": f.filename, "key": key, "status": "error", "detail": str(e)}
+    folder_index.add_key(key)
+    return {"file": f.filename, "key": key, "status": "uploaded"}
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"request larger than {UPLOAD_MAX_REQUEST_MB:g} MB"}), 413
+
+
 @app.post("/upload")
 def upload():
     folder = request.form.get("folder", "").strip()
-    print(f"start upload to folder: {folder}")
     if folder and not folder.endswith("/"):
         folder += "/"
 
     if "files" not in request.files:
         return jsonify({"error": "missing files"}), 400
 
-    uploaded = []
+    entries = []  # per-file result dicts, or futures for files being uploaded
+    max_bytes = UPLOAD_MAX_FILE_MB * 1024 * 1024
     for f in request.files.getlist("files"):
-        print(f"uploading {f.filename}")
-        if f.filename.lower().endswith(".txt"):
-            key = f"{folder}{f.filename}"
-            s3.upload_fileobj(f, S3_BUCKET, key, ExtraArgs={"ContentType": "text/plain"})
-            uploaded.append(key)
-
-    job = agent_client.start_ingestion_job(
-        knowledgeBaseId=KB_ID,
-        dataSourceId=DS_ID
-    )
+        if not f.filename.lower().endswith(".txt"):
+            entries.append({"file": f.filename, "status": "skipped", "detail": "only .txt files are accepted"})
+            continue
+        size = file_size(f)
+        if size > max_bytes:
+            entries.append({"file": f.filename, "status": "too_large", "bytes": size,
+                            "detail": f"larger than {UPLOAD_MAX_FILE_MB:g} MB"})
+            continue
+        entries.append(upload_pool.submit(upload_one, f, f"{folder}{f.filename}"))
+
+    with span("s3.upload"):
+        results = [e if isinstance(e, dict) else e.result() for e in entries]
+    uploaded = [r["key"] for r in results if r["status"] == "uploaded"]
 
-    return jsonify({"uploaded": uploaded})
+    # Ingestion runs in the background; uploads within the debounce window share a single job
+    ingestion_state = ingestion.request() if uploaded else None
+    return jsonify({"uploaded": uploaded, "files": results, "ingestion": ingestion_state})
 
 @app.get("/folders")
 def get_folders():
-    prefixes = set()
-    all_keys = []
-
-    paginator = s3.get_paginator("list_objects_v2")
-    for page in paginator.paginate(Bucket=S3_BUCKET):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            all_keys.append(key)
-
-    # Build folder structure
-    for key in all_keys:
-        parts = key.split("/")[:-1]  # remove filename
-        for i in range(1, len(parts) + 1):
-            prefix = "/".join(parts[:i])
-            prefixes.add(prefix)
-
-    folders = sorted(prefixes)
-    return jsonify({"folders": folders})
+    return jsonify({"folders": folder_index.folders()})
 
 # ---------------------------
 # API: ask KB
@@ -150,33 +689,408 @@ def ask():
     data = request.get_json()
     question = (data.get("question") or "").strip()
 
+    session, question = open_turn(data, question)
+    session_fields = turn_fields(session)
+    use_cache = shares_cache(session)
+
+    direct = fast_answer(question)
+    if direct is not None:
+        return jsonify({"answer": direct, "fast_path": True, **session_fields})
+
+    cached = cached_answer(question) if use_cache else None
+    if cached is not None:
+        return jsonify({"answer": cached, "cached": True, **session_fields})
+
+    answer = generate_answer(question, session)
+
+    if answer_cache is not None and use_cache:
+        answer_cache.put(question, answer)
+
+    return jsonify({"answer": answer, **session_fields})
+
+
+def query_vehicle(question: str):
+    """The vehicle to scope retrieval to, or None when vehicle filtering is off"""
+    return vehicle_parser.parse(question) if VEHICLE_FILTER_ENABLED else None
+
+
+def vector_search_config(question: str, number_of_results: int):
+    """Bedrock vectorSearchConfiguration, scoped to the vehicle in the question when enabled"""
+    retrieval = {"numberOfResults": number_of_results}
+    vehicle_scope = bedrock_filter(vehicle_parser.parse(question)) if VEHICLE_FILTER_ENABLED else None
+    if vehicle_scope is not None:
+        retrieval["filter"] = vehicle_scope
+    return retrieval
+
+
+def kb_generation_config(question: str, model_id: str):
+    """retrieveAndGenerateConfiguration shared by the blocking and streaming calls"""
+    retrieval = vector_search_config(question, TOP_K)
+
     # Use system prompt loaded from file
-    resp = agent_runtime.retrieve_and_generate(
-        input={"text": question},
-        retrieveAndGenerateConfiguration={
-            "type": "KNOWLEDGE_BASE",
-            "knowledgeBaseConfiguration": {
-                "knowledgeBaseId": KB_ID,
-                "modelArn": f"arn:aws:bedrock:{REGION}::foundation-model/anthropic.claude-3-sonnet-20240229-v1:0",
-                "generationConfiguration": {
-                    "promptTemplate": {
-                        "textPromptTemplate": f"""{SYSTEM_PROMPT}
+    return {
+        "type": "KNOWLEDGE_BASE",
+        "knowledgeBaseConfiguration": {
+            "knowledgeBaseId": KB_ID,
+            "modelArn": model_arn(model_id),
+            "retrievalConfiguration": {"vectorSearchConfiguration": retrieval},
+            "generationConfiguration": {
+                "promptTemplate": {
+                    "textPromptTemplate": f"""{SYSTEM_PROMPT}
 
 $search_results$
 
 User question: $query$
 
 Answer:"""
-                    }
                 }
             }
         }
+    }
+
+
+def retrieve_passages(query: str, category, vehicle, k: int):
+    """One retrieval from the local index or the Bedrock retrieve API (runs on the pipeline's threads)"""
+    if local_retriever is not None:
+        with span("local.retrieve"):
+            return local_retriever.retrieve(query, k, vehicle, category)
+
+    retrieval = {"numberOfResults": k}
+    scope = category_filter(vehicle or {}, category)
+    if scope is not None:
+        retrieval["filter"] = scope
+    with span("bedrock.retrieve"):
+        resp = agent_runtime.retrieve(
+            knowledgeBaseId=KB_ID,
+            retrievalQuery={"text": query},
+            retrievalConfiguration={"vectorSearchConfiguration": retrieval}
+        )
+    return [
+        {
+            "source": r.get("location", {}).get("s3Location", {}).get("uri", ""),
+            "text": r["content"]["text"],
+            "score": r.get("score", 0.0),
+        }
+        for r in resp["retrievalResults"]
+    ]
+
+
+# Split retrieve + generate pipeline for the "retrieve" and "local" engines
+retrieval_pipeline = retrieval_cache = None
+if RETRIEVAL_ENGINE != "bedrock":
+    from retrieval_pipeline import RetrievalCache, RetrievalPipeline
+
+    if RETRIEVAL_CACHE_MAX_ENTRIES > 0:
+        retrieval_cache = RetrievalCache(RETRIEVAL_CACHE_MAX_ENTRIES, RETRIEVAL_CACHE_TTL_SECONDS)
+    retrieval_pipeline = RetrievalPipeline(
+        retrieve_passages, RETRIEVAL_WORKERS, RETRIEVE_CANDIDATES, RETRIEVE_SUBQUERY_CANDIDATES,
+        RETRIEVAL_SPLIT_INTENTS, retrieval_cache
+    )
+
+
+def prefetch_retrieval(question: str):
+    """
+    Start retrieving for a question queued for a generation slot, so retrieval overlaps the
+    admission wait. Requests shed with a 429 never get here, so they cost no retrieval calls.
+    """
+    if retrieval_pipeline is None or not RETRIEVAL_PREFETCH:
+        return
+    # The local index loads during warm-up; until then retrieval waits in prompt_messages instead
+    if local_retriever is not None and not readiness.ready:
+        return
+    retrieval_pipeline.prefetch(question, query_vehicle(question))
+
+
+def retrieve_candidates(question: str):
+    """Candidate passages for context assembly: main and per-intent retrievals, merged"""
+    with span("retrieve"):
+        return retrieval_pipeline.candidates(question, query_vehicle(question))
+
+
+def prompt_messages(question: str):
+    """Retrieve candidates, then rerank/dedupe/pack them into the context token budget"""
+    # Only blocks for requests arriving before warm-up has finished
+    readiness.wait()
+    candidates = retrieve_candidates(question)
+    with span("context.build"):
+        search_results, _, _ = build_context(question, candidates, reranker, CONTEXT_TOKEN_BUDGET, TOP_K)
+
+    return [{
+        "role": "user",
+        "content": [{"text": f"""{search_results}
+
+User question: {question}
+
+Answer:"""}]
+    }]
+
+
+def generate_answer(question: str, session=None, lane: str = None):
+    """
+    Model answer. Refused with AdmissionRejected when the generation budget is exhausted
+    and with CircuitOpenError while Bedrock is overloaded.
+    """
+    lane = lane or question_lane(question)
+    with generation_slot(lane, lambda: prefetch_retrieval(question)), bedrock_breaker.guard():
+        return call_model(question, session)
+
+
+def stream_answer(question: str, session=None):
+    """Yield answer text chunks as the model produces them; the caller holds the generation slot"""
+    with bedrock_breaker.guard():
+        yield from stream_model(question, session)
+
+
+def kb_session_args(session):
+    """sessionId of the conversation's earlier retrieve_and_generate calls, if any"""
+    if session is None or session.bedrock_session_id is None:
+        return {}
+    return {"sessionId": session.bedrock_session_id}
+
+
+def call_model(question: str, session=None):
+    route, model_id = pick_model(question)
+    start = time.perf_counter()
+
+    if RETRIEVAL_ENGINE != "bedrock":
+        messages = prompt_messages(question)
+        with span("bedrock.converse"):
+            resp = bedrock_runtime.converse(
+                modelId=model_id,
+                system=[{"text": SYSTEM_PROMPT}],
+                messages=messages
+            )
+        answer = resp["output"]["message"]["content"][0]["text"]
+        usage = resp.get("usage", {})
+        record_usage(route, start, usage.get("inputTokens", 0), usage.get("outputTokens", 0))
+        return answer
+
+    with span("bedrock.retrieve_and_generate"):
+        resp = agent_runtime.retrieve_and_generate(
+            input={"text": question},
+            retrieveAndGenerateConfiguration=kb_generation_config(question, model_id),
+            **kb_session_args(session)
+        )
+    if session is not None:
+        session.bedrock_session_id = resp.get("sessionId")
+    answer = resp["output"]["text"]
+    # retrieve_and_generate reports no usage; estimate from the prompt, the cited passages and the answer
+    references = [r for c in resp.get("citations", []) for r in c.get("retrievedReferences", [])]
+    record_usage(route, start, kb_prompt_tokens(question, references), estimate_tokens(answer), estimated=True)
+    return answer
+
+
+def stream_model(question: str, session=None):
+    route, model_id = pick_model(question)
+    start = time.perf_counter()
+
+    # The *.stream_open spans measure time until the model starts answering
+    if RETRIEVAL_ENGINE != "bedrock":
+        messages = prompt_messages(question)
+        with span("bedrock.converse_stream_open"):
+            resp = bedrock_runtime.converse_stream(
+                modelId=model_id,
+                system=[{"text": SYSTEM_PROMPT}],
+                messages=messages
+            )
+        usage = {}
+        with span("bedrock.converse_stream"):
+            for event in resp["stream"]:
+                text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+                if text:
+                    yield text
+                usage = event.get("metadata", {}).get("usage", usage)
+        record_usage(route, start, usage.get("inputTokens", 0), usage.get("outputTokens", 0))
+        return
+
+    with span("bedrock.retrieve_and_generate_stream_open"):
+        resp = agent_runtime.retrieve_and_generate_stream(
+            input={"text": question},
+            retrieveAndGenerateConfiguration=kb_generation_config(question, model_id),
+            **kb_session_args(session)
+        )
+    if session is not None:
+        session.bedrock_session_id = resp.get("sessionId")
+    chunks, references = [], []
+    with span("bedrock.retrieve_and_generate_stream"):
+        for event in resp["stream"]:
+            text = event.get("output", {}).get("text")
+            if text:
+                chunks.append(text)
+                yield text
+            references.extend(event.get("citation", {}).get("retrievedReferences", []))
+    record_usage(route, start, kb_prompt_tokens(question, references), estimate_tokens("".join(chunks)),
+                 estimated=True)
+
+
+@app.get("/routes")
+def routes():
+    """Per-route model, request count, average latency, tokens and estimated cost"""
+    return jsonify(model_router.report())
+
+
+def sse(event: str, payload: dict):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/ask_stream")
+def ask_stream():
+    """Same as /ask, but forwards tokens to the browser as server-sent events"""
+    data = request.get_json()
+    question = (data.get("question") or "").strip()
+    session, question = open_turn(data, question)
+    session_fields = turn_fields(session)
+    use_cache = shares_cache(session)
+
+    direct = fast_answer(question)
+    cached = cached_answer(question) if direct is None and use_cache else None
+    release = None
+    if direct is None and cached is None:
+        # Admission happens before the stream starts, so an overloaded server answers with a plain 429
+        release = reserve_generation(question_lane(question), lambda: prefetch_retrieval(question))
+
+    def events():
+        if direct is not None:
+            yield sse("token", {"text": direct})
+            yield sse("done", {"fast_path": True, **session_fields})
+            return
+
+        if cached is not None:
+            yield sse("token", {"text": cached})
+            yield sse("done", {"cached": True, **session_fields})
+            return
+
+        chunks = []
+        try:
+            for text in stream_answer(question, session):
+                chunks.append(text)
+                yield sse("token", {"text": text})
+        except Exception as e:
+            logger.exception("ask stream failed")
+            yield sse("error", {"detail": str(e), "retry_after": round(getattr(e, "retry_after", 0)), **session_fields})
+            return
+
+        if answer_cache is not None and use_cache:
+            answer_cache.put(question, "".join(chunks))
+        yield sse("done", session_fields)
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+    if release is not None:
+        # Held until the stream is fully sent or the client goes away
+        response.call_on_close(release)
+    return response
+
+# ---------------------------
+# API: warning-light image
+# ---------------------------
+def identify_with_model(image, data: bytes, candidates):
+    """Warning id the model reads from the image (limited to the closest candidates, if any), or None"""
+    ids = [c["id"] for c in candidates] or list(icon_index.warnings)
+    image_format, image_bytes = bedrock_image(image, data)
+    model_id = model_router.routes["complex"]["model"]
+    start = time.perf_counter()
+
+    with generation_slot("safety"), bedrock_breaker.guard(), span("bedrock.converse_image"):
+        resp = bedrock_runtime.converse(
+            modelId=model_id,
+            messages=[{"role": "user", "content": [
+                {"text": "Which dashboard warning light does this image show? "
+                         f"Reply with exactly one id from this list, or unknown: {', '.join(ids)}"},
+                {"image": {"format": image_format, "source": {"bytes": image_bytes}}},
+            ]}]
+        )
+    usage = resp.get("usage", {})
+    record_usage("complex", start, usage.get("inputTokens", 0), usage.get("outputTokens", 0))
+    reply = resp["output"]["message"]["content"][0]["text"].strip().strip(".`'\"").lower()
+    return reply if reply in ids else None
+
+
+@app.post("/identify_warning")
+def identify_warning():
+    """Multipart "image" (photo of one dashboard symbol) -> closest warning_lights_full.json record"""
+    if icon_index is None:
+        return jsonify({"error": "warning light recognition is disabled"}), 404
+    f = request.files.get("image")
+    if f is None:
+        return jsonify({"error": "no image provided"}), 400
+    data = f.read()
+    try:
+        image = open_image(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with span("icon.match"):
+        matches = icon_index.match(image)
+    best = matches[0] if matches else None
+    confident = (best is not None and best["confidence"] >= WARNING_ICON_MIN_CONFIDENCE
+                 and (len(matches) == 1 or best["confidence"] - matches[1]["confidence"] >= WARNING_ICON_MIN_MARGIN))
+    cache_result("warning_icon", confident)
+
+    warning_id, source = (best["id"], "icon_index") if confident else (None, None)
+    if warning_id is None and WARNING_ICON_MODEL_FALLBACK:
+        warning_id = identify_with_model(image, data, matches)
+        source = "model" if warning_id is not None else None
 
-    return jsonify({"answer": resp["output"]["text"]})
+    return jsonify({
+        "warning": icon_index.warnings.get(warning_id) if warning_id else None,
+        "source": source,
+        "matches": matches,
+    })
+
+# ---------------------------
+# API: batch of questions, answered as NDJSON lines as each one finishes
+# ---------------------------
+from batch_runner import BatchRunner
+
+
+def resolve_local(question: str):
+    direct = fast_answer(question)
+    if direct is not None:
+        return direct, "fast_path"
+    cached = cached_answer(question)
+    if cached is not None:
+        return cached, "cache"
+    return None
+
+
+def generate_and_cache(question: str):
+    answer = generate_answer(question, lane="batch")
+    if answer_cache is not None:
+        answer_cache.put(question, answer)
+    return answer
+
+
+batch_runner = BatchRunner(resolve_local, generate_and_cache, BATCH_CONCURRENCY, BATCH_MAX_RETRIES)
+
+
+@app.post("/ask_batch")
+def ask_batch():
+    """Body: {"questions": [...]}; one JSON line per question: index, question, answer or error, source"""
+    data = request.get_json(silent=True) or {}
+    questions = data.get("questions")
+    if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+        return jsonify({"error": "questions must be a list of strings"}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"at most {BATCH_MAX_QUESTIONS} questions per batch"}), 400
+    questions = [q.strip() for q in questions]
+
+    def lines():
+        for result in batch_runner.run(questions):
+            yield json.dumps(result) + "\n"
+
+    return Response(
+        stream_with_context(lines()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ---------------------------
 # Run
 # ---------------------------
+# Development server only; production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8000")), debug=FLASK_DEBUG, threaded=True)
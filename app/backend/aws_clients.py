@@ -0,0 +1,159 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import boto3
+from botocore.config import Config
+
+from metrics import (AWS_RETRIES, AWS_THROTTLED_ATTEMPTS, CIRCUIT_REJECTIONS, CIRCUIT_STATE,
+                     THROTTLE_CODES, is_throttle)
+
+# ---------------------------
+# AWS client factory and circuit breaker
+# ---------------------------
+# One shared client per service with a sized connection pool, adaptive retry
+# mode (client-side rate limiting on throttles) and timeouts per service:
+# generation calls get a long read timeout, S3/control-plane calls a short one.
+# Every attempt botocore makes is counted, so throttles absorbed by retries
+# are visible on /metrics too.
+
+# Errors that mean "Bedrock is overloaded", as opposed to a bad request
+OVERLOAD_CODES = THROTTLE_CODES | {"ServiceUnavailableException", "ModelNotReadyException", "ServiceQuotaExceededException"}
+OVERLOAD_EXCEPTIONS = {"ReadTimeoutError", "ConnectTimeoutError", "EndpointConnectionError"}
+
+CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+
+def is_overload(error: Exception):
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return is_throttle(error) or code in OVERLOAD_CODES or type(error).__name__ in OVERLOAD_EXCEPTIONS
+
+
+def count_attempts(service: str):
+    """botocore event hooks counting retries and throttled attempts per operation"""
+
+    def after_call(parsed=None, model=None, **kwargs):
+        retries = (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        if retries:
+            AWS_RETRIES.inc(retries, service=service, operation=model.name if model is not None else "")
+
+    def needs_retry(response=None, operation=None, **kwargs):
+        # Called once per attempt, so throttles absorbed by retries are counted too
+        if response is not None and response[1].get("Error", {}).get("Code") in THROTTLE_CODES:
+            AWS_THROTTLED_ATTEMPTS.inc(service=service, operation=operation.name if operation is not None else "")
+
+    return after_call, needs_retry
+
+
+def make_aws_clients(region: str, max_pool_connections: int = 32, max_attempts: int = 4,
+                     connect_timeout: float = 5, read_timeout: float = 30, generation_read_timeout: float = 120):
+    """Return (s3, agent_runtime, agent_client, bedrock_runtime) boto3 clients"""
+
+    def client(service: str, timeout: float):
+        config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={"mode": "adaptive", "total_max_attempts": max_attempts},
+            connect_timeout=connect_timeout,
+            read_timeout=timeout
+        )
+        c = boto3.client(service, region_name=region, config=config)
+        after_call, needs_retry = count_attempts(service)
+        c.meta.events.register("after-call.*", after_call)
+        c.meta.events.register("needs-retry.*", needs_retry)
+        return c
+
+    return (
+        client("s3", read_timeout),
+        client("bedrock-agent-runtime", generation_read_timeout),
+        client("bedrock-agent", read_timeout),
+        client("bedrock-runtime", generation_read_timeout),
+    )
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is overloaded, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` overload errors within `window_seconds`; while open,
+    calls are refused for `cooldown_seconds`, then a single probe call decides
+    whether to close again (success) or stay open (failure).
+    """
+
+    def __init__(self, name: str, threshold: int = 5, window_seconds: float = 30, cooldown_seconds: float = 15):
+        self.name = name
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = deque()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+        CIRCUIT_STATE.set(CLOSED, circuit=name)
+
+    def _set_state(self, state: int):
+        self.state = state
+        CIRCUIT_STATE.set(state, circuit=self.name)
+
+    def retry_after(self):
+        return max(0.0, self.opened_at + self.cooldown_seconds - time.monotonic())
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and self.retry_after() == 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return
+            retry_after = max(self.retry_after(), 1.0)
+        CIRCUIT_REJECTIONS.inc(circuit=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self.lock:
+            self.probing = False
+            if self.state != CLOSED:
+                self.failures.clear()
+                self._set_state(CLOSED)
+
+    def record_failure(self, error: Exception):
+        """Count overload errors towards opening; other errors only end a probe"""
+        with self.lock:
+            was_probe = self.probing
+            self.probing = False
+            if not is_overload(error):
+                if was_probe:
+                    self._set_state(CLOSED)
+                return
+            now = time.monotonic()
+            self.failures.append(now)
+            while self.failures and self.failures[0] < now - self.window_seconds:
+                self.failures.popleft()
+            if was_probe or len(self.failures) >= self.threshold:
+                self.opened_at = now
+                self.failures.clear()
+                self._set_state(OPEN)
+
+    @contextmanager
+    def guard(self):
+        """Check the circuit, then record how the guarded block ended"""
+        self.check()
+        try:
+            yield
+        except BaseException as e:
+            # Includes GeneratorExit from an abandoned stream, which only ends a probe
+            self.record_failure(e)
+            raise
+        self.record_success()
+
+    def snapshot(self):
+        with self.lock:
+            return {"state": ("closed", "open", "half_open")[self.state], "retry_after": round(self.retry_after(), 1)}
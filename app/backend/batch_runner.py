@@ -0,0 +1,107 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from admission import AdmissionRejected
+from answer_cache import normalize_question
+from aws_clients import CircuitOpenError
+from metrics import is_throttle
+
+# ---------------------------
+# Batch question runner
+# ---------------------------
+# Answers many questions in one pass: identical questions (after normalization)
+# are answered once, questions with a local answer (fast path / answer cache)
+# are resolved first, and the rest fan out to the model on a bounded pool.
+# Throttled calls (and calls refused by the open circuit or shed by admission
+# control) are retried with jittered exponential backoff, and a throttle
+# pauses every worker of the batch so the whole batch slows down together.
+
+
+class BatchRunner:
+    def __init__(self, resolve_local, generate, concurrency: int = 8,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.resolve_local = resolve_local  # question -> (answer, source) or None
+        self.generate = generate            # question -> answer
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def run(self, questions):
+        """Yield one result dict per input question, in completion order"""
+        groups = {}  # normalized question -> input indexes
+        for i, question in enumerate(questions):
+            groups.setdefault(normalize_question(question), []).append(i)
+
+        remote = []
+        for indexes in groups.values():
+            question = questions[indexes[0]]
+            local = self.resolve_local(question)
+            if local is None:
+                remote.append(indexes)
+                continue
+            answer, source = local
+            yield from self._results(questions, indexes, {"answer": answer, "source": source, "attempts": 0})
+
+        if not remote:
+            return
+
+        backoff = Backoff(self.base_delay, self.max_delay)
+        pool = ThreadPoolExecutor(max_workers=min(self.concurrency, len(remote)), thread_name_prefix="batch")
+        futures = {pool.submit(self._answer, questions[indexes[0]], backoff): indexes for indexes in remote}
+        try:
+            for future in as_completed(futures):
+                yield from self._results(questions, futures[future], future.result())
+        finally:
+            # Client went away: drop whatever has not started yet
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _results(self, questions, indexes, outcome: dict):
+        for n, i in enumerate(indexes):
+            result = {"index": i, "question": questions[i], **outcome}
+            if n:
+                result["duplicate_of"] = indexes[0]
+            yield result
+
+    def _answer(self, question: str, backoff):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            backoff.wait()
+            try:
+                answer = self.generate(question)
+            except Exception as e:
+                if (is_throttle(e) or isinstance(e, (CircuitOpenError, AdmissionRejected))) and attempt <= self.max_retries:
+                    backoff.throttled(attempt, getattr(e, "retry_after", 0))
+                    continue
+                return {"error": str(e), "source": "model", "attempts": attempt,
+                        "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+            return {"answer": answer, "source": "model", "attempts": attempt,
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+class Backoff:
+    """Shared pause: a throttled call pushes back the start of every later call in the batch"""
+
+    def __init__(self, base_delay: float, max_delay: float):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def throttled(self, attempt: int, min_delay: float = 0):
+        # Full jitter: a random delay up to base * 2^attempt, capped; never shorter than a Retry-After
+        delay = max(min_delay, random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+    def wait(self):
+        while True:
+            with self.lock:
+                remaining = self.resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
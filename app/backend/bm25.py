@@ -0,0 +1,53 @@
+import re
+import math
+from collections import Counter
+
+from nltk.stem import PorterStemmer
+
+# ---------------------------
+# BM25 keyword index
+# ---------------------------
+# Sparse half of the hybrid retriever: exact terms such as "0W-20", "DOT 4"
+# or "FL22" are matched here even when the embedding model blurs them.
+
+stemmer = PorterStemmer()
+
+
+def bm25_tokenize(text: str):
+    return [stemmer.stem(token) for token in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+class BM25:
+    def __init__(self, documents, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(bm25_tokenize(doc)) for doc in documents]
+        self.doc_lens = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_len = sum(self.doc_lens) / len(self.doc_lens) if self.doc_lens else 0.0
+
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def scores(self, query: str, candidates=None):
+        """Return {doc_id: score} for documents (optionally restricted to candidates) sharing a query term"""
+        terms = [t for t in set(bm25_tokenize(query)) if t in self.idf]
+        doc_ids = range(len(self.term_freqs)) if candidates is None else candidates
+        results = {}
+        for i in doc_ids:
+            tf = self.term_freqs[i]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lens[i] / (self.avg_len or 1))
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                results[i] = score
+        return results
+
+    def top(self, query: str, k: int, candidates=None):
+        scores = self.scores(query, candidates)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
@@ -0,0 +1,89 @@
+import re
+import math
+
+# ---------------------------
+# Context assembly
+# ---------------------------
+# Turns retrieved candidates into the prompt context: rerank against the
+# question, drop duplicate/overlapping chunks, then pack the best ones into a
+# fixed token budget so input tokens (cost and latency) are bounded.
+
+# Jaccard overlap above which a chunk is considered a duplicate of one already packed
+DUPLICATE_OVERLAP = 0.8
+
+
+def estimate_tokens(text: str):
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return math.ceil(len(text) / 4)
+
+
+def word_set(text: str):
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def format_passage(passage: dict):
+    return f"[{passage['source']}]\n{passage['text']}"
+
+
+class Reranker:
+    """Cross-encoder reranker from sentence-transformers; passthrough when no model is configured"""
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name
+        self.model = None
+
+    def load(self):
+        if self.model_name and self.model is None:
+            from sentence_transformers import CrossEncoder
+
+            self.model = CrossEncoder(self.model_name)
+        return self
+
+    def rerank(self, question: str, passages):
+        if not self.model_name or not passages:
+            return passages
+        self.load()
+        scores = self.model.predict([(question, p["text"]) for p in passages], show_progress_bar=False)
+        ranked = sorted(zip(scores, range(len(passages))), reverse=True)
+        return [{**passages[i], "score": float(score)} for score, i in ranked]
+
+
+def dedupe(passages):
+    """Drop passages contained in, or mostly overlapping with, a higher-ranked one"""
+    kept, kept_words = [], []
+    for passage in passages:
+        words = word_set(passage["text"])
+        duplicate = False
+        for other, other_words in zip(kept, kept_words):
+            if passage["text"] in other["text"]:
+                duplicate = True
+                break
+            union = words | other_words
+            if union and len(words & other_words) / len(union) >= DUPLICATE_OVERLAP:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(passage)
+            kept_words.append(words)
+    return kept
+
+
+def pack(passages, token_budget: int, max_passages: int = None):
+    """Greedily keep passages in rank order while they fit in the token budget"""
+    packed, used = [], 0
+    for passage in passages:
+        if max_passages is not None and len(packed) >= max_passages:
+            break
+        cost = estimate_tokens(format_passage(passage))
+        if used + cost > token_budget:
+            continue
+        packed.append(passage)
+        used += cost
+    return packed, used
+
+
+def build_context(question: str, candidates, reranker: Reranker, token_budget: int, max_passages: int = None):
+    """Rerank, dedupe and pack candidates; returns (context_text, passages, context_tokens)"""
+    ranked = dedupe(reranker.rerank(question, candidates))
+    passages, used = pack(ranked, token_budget, max_passages)
+    return "\n\n".join(format_passage(p) for p in passages), passages, used
@@ -0,0 +1,224 @@
+import os
+import json
+import fcntl
+import shutil
+import logging
+from pathlib import Path
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# On-disk embedding store
+# ---------------------------
+# Passage embeddings are stored as one compact matrix (float16, or int8 with a
+# per-row scale) and memory-mapped, so RAM holds only the pages a search
+# touches. manifest.json maps every KB file to its row range, which lets an
+# update re-embed only the files that changed and copy every other row over.
+#
+# Each update is written to a new generation directory and published by
+# atomically replacing the CURRENT pointer; searches keep using the snapshot
+# they started with, so readers never wait for a writer. Writers in different
+# processes (gunicorn workers) take turns through a lock file.
+
+CURRENT_FILE = "CURRENT"
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+PASSAGES_FILE = "passages.json"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+DTYPES = ("float16", "int8")
+SEARCH_BLOCK_ROWS = 4096  # rows converted to float32 at a time while scoring (cache-sized blocks)
+
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """Return (stored_matrix, per-row scales or None) for float32 input"""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive lock across processes, held for the duration of the block"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class StoreSnapshot:
+    """One immutable, memory-mapped generation of the store"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.manifest = json.loads((path / MANIFEST_FILE).read_text(encoding="utf-8"))
+        self.passages = json.loads((path / PASSAGES_FILE).read_text(encoding="utf-8"))
+        self.vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        self.scales = np.load(path / SCALES_FILE, mmap_mode="r") if (path / SCALES_FILE).exists() else None
+
+    @property
+    def files(self):
+        return self.manifest["files"]
+
+    def scores(self, query: np.ndarray, rows=None):
+        """Inner product of the query with every stored row (or only `rows`)"""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            out = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+        else:
+            out = np.empty(len(self.vectors), dtype=np.float32)
+            for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+                block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                out[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            out *= self.scales[rows] if rows is not None else self.scales
+        return out
+
+    def top(self, query: np.ndarray, k: int, rows=None):
+        """Row ids of the k best-scoring rows, best first"""
+        if not len(self.vectors) or k <= 0:
+            return []
+        scores = self.scores(query, rows)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        if rows is not None:
+            return [int(rows[i]) for i in best]
+        return [int(i) for i in best]
+
+
+class EmbeddingStore:
+    def __init__(self, store_dir: str, model_name: str, dtype: str = "float16"):
+        if dtype not in DTYPES:
+            raise ValueError(f"embedding dtype must be one of {DTYPES}, got {dtype!r}")
+        self.store_dir = Path(store_dir).resolve()
+        self.model_name = model_name
+        self.dtype = dtype
+
+    def load(self):
+        """Current snapshot, or None if there is none for this model and dtype"""
+        pointer = self.store_dir / CURRENT_FILE
+        if not pointer.exists():
+            return None
+        snapshot = StoreSnapshot(self.store_dir / pointer.read_text(encoding="utf-8").strip())
+        if snapshot.manifest.get("model") != self.model_name or snapshot.manifest.get("dtype") != self.dtype:
+            return None
+        return snapshot
+
+    def update(self, previous, files: dict, read_passages, embed):
+        """
+        Write a new generation for `files` ({path: fingerprint}) and publish it.
+        Files whose fingerprint matches `previous` keep their rows; the others are
+        re-read with read_passages(path) and re-embedded with embed(texts).
+        Returns (snapshot, number of re-embedded files).
+        """
+        with file_lock(self.store_dir / LOCK_FILE):
+            # Another worker may have published while we waited: reuse its generation if it
+            # already covers `files`, otherwise build on it (its rows are the most recent)
+            latest = self.load()
+            if latest is not None and (previous is None or latest.path != previous.path):
+                if {path: f["fingerprint"] for path, f in latest.files.items()} == files:
+                    return latest, 0
+                keep = previous.path.name if previous is not None else None
+                return self._write(latest, files, read_passages, embed, keep)
+            return self._write(previous, files, read_passages, embed, None)
+
+    def _write(self, previous, files: dict, read_passages, embed, keep):
+        """Write and publish a generation; caller holds the store lock. `keep` is an extra generation to retain"""
+        old_files = previous.files if previous is not None else {}
+        plan = []  # (path, fingerprint, old_start or None, passages)
+        new_texts = []
+        for path, fingerprint in files.items():
+            old = old_files.get(path)
+            if old is not None and old["fingerprint"] == fingerprint:
+                plan.append((path, fingerprint, old["start"], previous.passages[old["start"]:old["start"] + old["count"]]))
+            else:
+                passages = read_passages(path)
+                plan.append((path, fingerprint, None, passages))
+                new_texts.extend(p["text"] for p in passages)
+
+        new_vectors = np.asarray(embed(new_texts), dtype=np.float32) if new_texts else None
+        if new_vectors is not None:
+            dim = new_vectors.shape[1]
+        elif previous is not None and previous.vectors.ndim == 2:
+            dim = previous.vectors.shape[1]
+        else:
+            dim = 0
+        new_stored, new_scales = quantize(new_vectors, self.dtype) if new_vectors is not None else (None, None)
+
+        generation = max(self._generations(), default=0) + 1
+        target = self.store_dir / f"gen-{generation:06d}"
+        staging = self.store_dir / f".{target.name}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        total = sum(len(passages) for _, _, _, passages in plan)
+        vectors = np.lib.format.open_memmap(staging / VECTORS_FILE, mode="w+", dtype=self.dtype, shape=(total, dim))
+        scales = (np.lib.format.open_memmap(staging / SCALES_FILE, mode="w+", dtype=np.float32, shape=(total,))
+                  if self.dtype == "int8" else None)
+
+        manifest_files, passages_out = {}, []
+        row, new_row = 0, 0
+        for path, fingerprint, old_start, passages in plan:
+            count = len(passages)
+            if old_start is not None:
+                vectors[row:row + count] = previous.vectors[old_start:old_start + count]
+                if scales is not None:
+                    scales[row:row + count] = previous.scales[old_start:old_start + count]
+            elif count:
+                vectors[row:row + count] = new_stored[new_row:new_row + count]
+                if scales is not None:
+                    scales[row:row + count] = new_scales[new_row:new_row + count]
+                new_row += count
+            manifest_files[path] = {"fingerprint": fingerprint, "start": row, "count": count}
+            passages_out.extend(passages)
+            row += count
+        vectors.flush()
+        del vectors
+        if scales is not None:
+            scales.flush()
+            del scales
+
+        (staging / PASSAGES_FILE).write_text(json.dumps(passages_out, ensure_ascii=False), encoding="utf-8")
+        manifest = {"model": self.model_name, "dtype": self.dtype, "dim": dim,
+                    "generation": generation, "files": manifest_files}
+        (staging / MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+
+        # Publish: the generation directory first, then the pointer (os.replace is atomic)
+        staging.rename(target)
+        pointer_tmp = self.store_dir / f".{CURRENT_FILE}.tmp"
+        pointer_tmp.write_text(target.name, encoding="utf-8")
+        os.replace(pointer_tmp, self.store_dir / CURRENT_FILE)
+        self._remove_old_generations(keep={target.name, previous.path.name if previous is not None else None, keep})
+
+        changed = sum(1 for _, _, old_start, _ in plan if old_start is None)
+        logger.info("embedding store updated", extra={"fields": {
+            "generation": generation, "files": len(plan), "reembedded_files": changed,
+            "removed_files": len(set(old_files) - set(files)), "rows": total, "dtype": self.dtype,
+        }})
+        return StoreSnapshot(target), changed
+
+    def _generations(self):
+        for path in self.store_dir.glob("gen-*"):
+            try:
+                yield int(path.name.split("-", 1)[1])
+            except ValueError:
+                continue
+
+    def _remove_old_generations(self, keep):
+        """Delete every generation except the new one and the one readers may still be searching"""
+        for path in self.store_dir.glob("gen-*"):
+            if path.name not in keep:
+                # Mapped pages of a removed generation stay valid until unmapped
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,125 @@
+import re
+import logging
+import json
+from pathlib import Path
+
+from spec_lookup import PROCEDURAL_WORDS
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Structured fast-path lookup
+# ---------------------------
+# In-memory indexes over the small, high-frequency structured datasets
+# (warning lights + tire pressures). Questions with a confident hit are
+# answered directly, without calling Bedrock.
+
+WARNINGS_FILE = Path("warnings") / "warning_lights_full.json"
+TIRE_PRESSURE_FILE = Path("tire_pressure") / "tire_pressures.json"
+
+# A warning-light answer is only given when the question names a light itself
+WARNING_CONTEXT_WORDS = {"light", "lights", "indicator", "indicators", "lamp", "lamps", "symbol", "symbols", "icon", "icons"}
+# One-word keywords ("oil", "brake") next to these are spec questions, not warning lights
+SPEC_WORDS = {"viscosity", "capacity", "type", "grade", "fluid", "warranty", "spec", "specs",
+              "specification", "specifications", "size", "volume", "liters", "litres", "quarts"}
+# Besides the light, the question also asks for a procedure or a spec value ("which oil does it
+# take and how do I top it up"); "why is the light on" is still about the warning itself
+MIXED_INTENT_WORDS = (PROCEDURAL_WORDS - {"why"}) | {"which"}
+PRESSURE_WORDS = {"pressure", "psi"}
+TIRE_WORDS = {"tire", "tires", "tyre", "tyres"}
+
+
+def tokenize(text: str):
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+class FastLookup:
+    def __init__(self, kb_dir: str):
+        self.kb_dir = Path(kb_dir)
+        self.warnings = {}    # id -> record
+        self.phrases = {}     # keyword/name phrase (tuple of tokens) -> set of warning ids
+        self.token_index = {} # first token of a phrase -> list of phrases starting with it
+        self.pressures = {}   # (make, model, year) -> {"front": ..., "rear": ...}
+        self.display_names = {}
+
+    def build(self):
+        """Load both datasets and build the in-memory indexes"""
+        warnings_path = self.kb_dir / WARNINGS_FILE
+        if warnings_path.exists():
+            for record in json.loads(warnings_path.read_text(encoding="utf-8")):
+                self.warnings[record["id"]] = record
+                for phrase in record.get("keywords", []) + [record.get("name_en", "")]:
+                    tokens = tuple(tokenize(phrase))
+                    if tokens:
+                        self.phrases.setdefault(tokens, set()).add(record["id"])
+            for tokens in self.phrases:
+                self.token_index.setdefault(tokens[0], []).append(tokens)
+
+        pressures_path = self.kb_dir / TIRE_PRESSURE_FILE
+        if pressures_path.exists():
+            for vehicle, values in json.loads(pressures_path.read_text(encoding="utf-8")).items():
+                make, model, year = vehicle.split("_", 2)
+                key = (make.lower(), model.lower(), year)
+                self.pressures[key] = values
+                self.display_names[key] = f"{year} {make} {model}"
+
+        logger.info("fast lookup ready", extra={"fields": {"warning_lights": len(self.warnings), "tire_pressures": len(self.pressures)}})
+        return self
+
+    def match_warning(self, tokens):
+        """Return (warning id, phrase length) of the longest matching phrase, or None if absent/ambiguous"""
+        best_len, best_ids = 0, set()
+        for i, token in enumerate(tokens):
+            for phrase in self.token_index.get(token, []):
+                if tuple(tokens[i:i + len(phrase)]) != phrase:
+                    continue
+                if len(phrase) > best_len:
+                    best_len, best_ids = len(phrase), set(self.phrases[phrase])
+                elif len(phrase) == best_len:
+                    best_ids |= self.phrases[phrase]
+        if len(best_ids) != 1:
+            return None
+        return next(iter(best_ids)), best_len
+
+    def match_vehicle(self, tokens):
+        """Return the (make, model, year) key mentioned in the question, or None if absent/ambiguous"""
+        token_set = set(tokens)
+        candidates = []
+        for key in self.pressures:
+            make, model, year = key
+            if year not in token_set or model not in token_set:
+                continue
+            # Purely numeric models ("3") are too ambiguous without the make
+            if model.isdigit() and make not in token_set:
+                continue
+            candidates.append(key)
+        if len(candidates) != 1:
+            return None
+        return candidates[0]
+
+    def answer(self, question: str):
+        """Return a direct answer for a confident hit, otherwise None (fall back to RAG)"""
+        tokens = tokenize(question)
+        token_set = set(tokens)
+
+        if not token_set & WARNING_CONTEXT_WORDS and token_set & PRESSURE_WORDS and token_set & TIRE_WORDS:
+            vehicle = self.match_vehicle(tokens)
+            if vehicle is not None:
+                values = self.pressures[vehicle]
+                return (f"Recommended tire pressure for the {self.display_names[vehicle]}: "
+                        f"{values['front']} front, {values['rear']} rear.")
+            return None
+
+        if token_set & WARNING_CONTEXT_WORDS:
+            match = self.match_warning(tokens)
+            if match is None or (match[1] == 1 and token_set & SPEC_WORDS):
+                return None
+            # Words of the light's own name ("check engine light") don't count as another intent
+            name_words = {t for phrase, ids in self.phrases.items() if match[0] in ids for t in phrase}
+            if (token_set - name_words) & MIXED_INTENT_WORDS:
+                return None
+            w = self.warnings[match[0]]
+            return (f"{w['name_en']} (severity {w['severity_level']}/5, urgency {w['urgency_level']}/5). "
+                    f"{w['description_en']} {w['action_en']} Driving: {w['drive_restriction']}.")
+
+        return None
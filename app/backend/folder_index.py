@@ -0,0 +1,99 @@
+import logging
+import time
+import threading
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Folder tree index for /folders
+# ---------------------------
+# Computed from a flat paginated listing (1000 keys per request, only the folder
+# prefixes are kept), held in memory, updated incrementally when /upload writes
+# keys and refreshed in the background once it is older than the TTL.
+
+
+def key_prefixes(key: str):
+    """All folder prefixes of a key, e.g. "a/b/c.txt" -> ["a", "a/b"]"""
+    parts = key.split("/")[:-1]  # remove filename
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+class FolderIndex:
+    def __init__(self, s3_client, bucket: str, ttl_seconds: float = 300):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.ttl_seconds = ttl_seconds
+        self.prefixes = None
+        self.sorted_cache = None
+        self.loaded_at = 0.0
+        self.refreshing = False
+        self.added = None  # prefixes of keys added while a listing runs, merged into its result
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()  # concurrent first requests share one initial listing
+
+    def _list_prefixes(self):
+        """Folder prefixes of every key; pages are consumed as they arrive, keys are not kept"""
+        prefixes = set()
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get("Contents", []):
+                prefixes.update(key_prefixes(obj["Key"]))
+        return prefixes
+
+    def refresh(self):
+        with self.lock:
+            self.added = set()
+        try:
+            with span("s3.list_prefixes"):
+                prefixes = self._list_prefixes()
+        except Exception:
+            with self.lock:
+                self.added = None
+            raise
+        with self.lock:
+            # Keys written after the listing passed their position would be lost otherwise
+            self.prefixes = prefixes | self.added
+            self.added = None
+            self.sorted_cache = None
+            self.loaded_at = time.time()
+            self.refreshing = False
+
+    def _refresh_in_background(self):
+        def run():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("folder refresh failed")
+                with self.lock:
+                    self.refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def folders(self):
+        """Return the sorted folder list, serving stale data while a refresh runs"""
+        if self.prefixes is None:
+            with self.load_lock:
+                if self.prefixes is None:
+                    self.refresh()
+
+        with self.lock:
+            if time.time() - self.loaded_at > self.ttl_seconds and not self.refreshing:
+                self.refreshing = True
+                self._refresh_in_background()
+            if self.sorted_cache is None:
+                self.sorted_cache = sorted(self.prefixes)
+            return self.sorted_cache
+
+    def add_key(self, key: str):
+        """Record the folders of a newly written key without re-listing the bucket"""
+        with self.lock:
+            if self.added is not None:
+                self.added.update(key_prefixes(key))
+            if self.prefixes is None:
+                return
+            new = set(key_prefixes(key)) - self.prefixes
+            if new:
+                self.prefixes |= new
+                self.sorted_cache = None
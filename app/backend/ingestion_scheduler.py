@@ -0,0 +1,289 @@
+import logging
+import time
+import threading
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Ingestion job scheduler
+# ---------------------------
+# Coalesces upload bursts into a single Bedrock ingestion job: requests within
+# the debounce window share one job, at most one job is in flight, and at most
+# one follow-up is queued behind it. A job that fails to start is retried
+# after another debounce window. Job status is tracked by a single
+# background poller (with exponential backoff) and served from memory;
+# clients can block on wait_for_change() to be pushed every state change.
+# Jobs started by other worker processes are picked up by watch(), which
+# runs the completion hook here when a new job completes on the data source.
+
+IN_PROGRESS_STATUSES = ("STARTING", "IN_PROGRESS", "STOPPING")
+COMPLETE_STATUSES = ("COMPLETE", "COMPLETED")
+TERMINAL_STATUSES = COMPLETE_STATUSES + ("FAILED", "STOPPED")
+
+
+class IngestionScheduler:
+    def __init__(self, agent_client, kb_id: str, ds_id: str,
+                 debounce_seconds: float = 10, poll_seconds: float = 5, max_poll_seconds: float = 60,
+                 on_complete=None):
+        self.agent_client = agent_client
+        self.kb_id = kb_id
+        self.ds_id = ds_id
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.on_complete = on_complete
+        self.jobs = {}            # job_id -> last known status
+        self.polled = set()       # jobs with a poller in this process (their hook runs there)
+        self.completed_job = None # latest completed job seen on the data source
+        self.current_job = None   # job id in flight
+        self.starting = False     # a start_ingestion_job call is in flight (made without the lock)
+        self.last_job = None
+        self.follow_up = False    # one more job needed after the current one
+        self.timer = None         # pending debounce timer
+        self.last_error = None
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.version = 0          # bumped on every state change
+
+    def request(self, immediate: bool = False):
+        """Ask for the KB to be re-ingested; returns the scheduler state"""
+        start = False
+        with self.lock:
+            if self.current_job is not None or self.starting:
+                self.follow_up = True
+            elif immediate:
+                self._cancel_timer()
+                self.starting = start = True
+            else:
+                self._arm_timer()
+            self._notify()
+        if start:
+            self._start_job()
+        return self.state()
+
+    def _arm_timer(self):
+        """Start the debounce timer unless one is pending; caller holds the lock"""
+        if self.timer is None:
+            self.timer = threading.Timer(self.debounce_seconds, self._on_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _notify(self):
+        """Wake every client waiting for a state change; caller holds the lock"""
+        self.version += 1
+        self.changed.notify_all()
+
+    def _on_timer(self):
+        start = False
+        with self.lock:
+            self.timer = None
+            if self.current_job is None and not self.starting:
+                self.starting = start = True
+            else:
+                self.follow_up = True
+            self._notify()
+        if start:
+            self._start_job()
+
+    def _start_job(self):
+        """
+        Start an ingestion job. The caller sets self.starting under the lock and calls
+        this after releasing it, so the AWS call never blocks state(), request() or SSE clients.
+        """
+        try:
+            with span("bedrock.start_ingestion_job"):
+                job = self.agent_client.start_ingestion_job(
+                    knowledgeBaseId=self.kb_id,
+                    dataSourceId=self.ds_id
+                )
+        except Exception as e:
+            # Throttling, or a ConflictException while another worker's job runs: try again later.
+            # The retry also covers any request queued while this call was in flight.
+            logger.exception("starting ingestion failed, retrying after the debounce window")
+            with self.lock:
+                self.starting = False
+                self.follow_up = False
+                self.last_error = str(e)
+                self._arm_timer()
+                self._notify()
+            return None
+
+        job_id = job["ingestionJob"]["ingestionJobId"]
+        with self.lock:
+            self.starting = False
+            self.jobs[job_id] = job["ingestionJob"].get("status", "STARTING")
+            self.current_job = job_id
+            self.last_job = job_id
+            self.last_error = None
+            self.polled.add(job_id)
+            self._notify()
+        logger.info("ingestion job started", extra={"fields": {"job_id": job_id}})
+        threading.Thread(target=self._poll, args=(job_id,), daemon=True).start()
+        return job_id
+
+    def _fetch_status(self, job_id: str):
+        with span("bedrock.get_ingestion_job"):
+            res = self.agent_client.get_ingestion_job(
+                knowledgeBaseId=self.kb_id,
+                dataSourceId=self.ds_id,
+                ingestionJobId=job_id
+            )
+        return res["ingestionJob"]["status"]
+
+    def _poll(self, job_id: str):
+        """
+        Single background poller for a job, shared by every client.
+        The interval doubles up to max_poll_seconds while the status is unchanged.
+        When the job ends, the queued follow-up (if any) is started.
+        """
+        interval = self.poll_seconds
+        while True:
+            time.sleep(interval)
+            try:
+                status = self._fetch_status(job_id)
+            except Exception as e:
+                logger.warning("ingestion status check failed", extra={"fields": {"job_id": job_id, "error": str(e)}})
+                interval = min(interval * 2, self.max_poll_seconds)
+                continue
+
+            if status not in IN_PROGRESS_STATUSES:
+                break
+
+            with self.lock:
+                if self.jobs.get(job_id) != status:
+                    self.jobs[job_id] = status
+                    self._notify()
+                    interval = self.poll_seconds
+                else:
+                    interval = min(interval * 2, self.max_poll_seconds)
+
+        # Run the completion hook before publishing the final status, so clients
+        # notified of COMPLETE never see state from before the job. A failing hook
+        # must not leave current_job set, or no job would ever start again.
+        logger.info("ingestion job finished", extra={"fields": {"job_id": job_id, "status": status}})
+        if status in COMPLETE_STATUSES and self.on_complete is not None:
+            try:
+                self.on_complete(job_id)
+            except Exception:
+                logger.exception("ingestion completion hook failed", extra={"fields": {"job_id": job_id}})
+
+        with self.lock:
+            self.jobs[job_id] = status
+            self.current_job = None
+            start = self.follow_up
+            if start:
+                self.follow_up = False
+                self.starting = True
+            self._notify()
+        if start:
+            self._start_job()
+
+    def track(self, job_id: str):
+        """Adopt a job started elsewhere (e.g. by another worker) so it gets a poller here"""
+        with self.lock:
+            if job_id in self.jobs or self.current_job is not None or self.starting:
+                return
+        status = self._fetch_status(job_id)
+        with self.lock:
+            if job_id in self.jobs or self.current_job is not None or self.starting:
+                return
+            self.jobs[job_id] = status
+            self.last_job = job_id
+            if status in IN_PROGRESS_STATUSES:
+                self.current_job = job_id
+                self.polled.add(job_id)
+                threading.Thread(target=self._poll, args=(job_id,), daemon=True).start()
+            self._notify()
+
+    def latest_completed_job(self):
+        """Id of the most recently started job that completed on the data source, or None"""
+        with span("bedrock.list_ingestion_jobs"):
+            res = self.agent_client.list_ingestion_jobs(
+                knowledgeBaseId=self.kb_id,
+                dataSourceId=self.ds_id,
+                filters=[{"attribute": "STATUS", "operator": "EQ", "values": list(COMPLETE_STATUSES)}],
+                sortBy={"attribute": "STARTED_AT", "order": "DESCENDING"},
+                maxResults=1
+            )
+        summaries = res.get("ingestionJobSummaries", [])
+        return summaries[0]["ingestionJobId"] if summaries else None
+
+    def watch(self, interval: float):
+        """Check the data source every interval seconds for jobs completed by other workers"""
+        threading.Thread(target=self._watch, args=(interval,), daemon=True).start()
+
+    def _watch(self, interval: float):
+        baseline = True
+        while True:
+            try:
+                job_id = self.latest_completed_job()
+            except Exception as e:
+                logger.warning("ingestion watch failed", extra={"fields": {"error": str(e)}})
+                time.sleep(interval)
+                continue
+
+            with self.lock:
+                fresh = not baseline and job_id is not None and job_id != self.completed_job and job_id not in self.polled
+                self.completed_job = job_id
+            baseline = False
+
+            # The first answer is the state this process started from; jobs polled here run their own hook
+            if fresh and self.on_complete is not None:
+                logger.info("ingestion job completed by another worker", extra={"fields": {"job_id": job_id}})
+                try:
+                    self.on_complete(job_id)
+                except Exception:
+                    logger.exception("ingestion completion hook failed", extra={"fields": {"job_id": job_id}})
+            time.sleep(interval)
+
+    def job_status(self, job_id: str):
+        """Status of a job from the scheduler cache; unknown jobs are fetched once"""
+        with self.lock:
+            if job_id in self.jobs:
+                return self.jobs[job_id]
+
+        status = self._fetch_status(job_id)
+        if status not in IN_PROGRESS_STATUSES:
+            with self.lock:
+                self.jobs[job_id] = status
+        return status
+
+    def state(self):
+        with self.lock:
+            job_id = self.current_job or self.last_job
+            if self.current_job is None and self.starting:
+                status = "STARTING"
+            elif self.current_job is None and self.timer is not None:
+                status = "SCHEDULED"
+            elif job_id is None:
+                status = "IDLE"
+            else:
+                status = self.jobs.get(job_id)
+            state = {
+                "jobId": job_id,
+                "status": status,
+                "queued": self.follow_up,
+            }
+            if self.last_error:
+                state["error"] = self.last_error
+            return state
+
+    def is_settled(self, state: dict):
+        """
+        True once the last job ended and nothing is queued. IDLE is not settled: a worker
+        that has not seen the job yet (e.g. a reconnecting client's) just has no state for it.
+        """
+        return not state["queued"] and state["status"] in TERMINAL_STATUSES
+
+    def wait_for_change(self, version: int, timeout: float = None):
+        """Block until the state version differs from version; returns (version, state)"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version, self.state()
@@ -0,0 +1,254 @@
+import re
+import time
+import uuid
+import hashlib
+import threading
+from pathlib import Path
+
+from local_retriever import load_passages
+
+# ---------------------------
+# Local (offline) provider
+# ---------------------------
+# Drop-in stand-ins for the boto3 clients app.py uses (s3, bedrock-agent-runtime,
+# bedrock-agent, bedrock-runtime). Objects live on the filesystem under the
+# knowledge_base folder, retrieval is a keyword scorer over those files and
+# generation is a deterministic stub with configurable latency, so the request
+# path can be run and benchmarked without AWS.
+
+
+def tokenize(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+def stub_answer(question: str, passages):
+    """Deterministic answer: the first line of the best passage and its source"""
+    if not passages:
+        return f"No information found for: {question}"
+    first_line = passages[0]["text"].strip().splitlines()[0]
+    return f"{first_line} (source: {passages[0]['source']})"
+
+
+def reference(passage: dict):
+    """A passage in the retrievedReferences shape of retrieve_and_generate citations"""
+    return {"content": {"text": passage["text"]}, "location": {"type": "S3", "s3Location": {"uri": passage["source"]}}}
+
+
+def matches_filter(condition: dict, uri: str):
+    """Evaluate the retrieval filters app.py builds (andAll / orAll / stringContains) against a source URI"""
+    if "andAll" in condition:
+        return all(matches_filter(c, uri) for c in condition["andAll"])
+    if "orAll" in condition:
+        return any(matches_filter(c, uri) for c in condition["orAll"])
+    if "stringContains" in condition:
+        return condition["stringContains"]["value"] in uri
+    return True
+
+
+class KeywordRetriever:
+    """Token-overlap scorer over the local KB; reloaded when a local ingestion job runs"""
+
+    def __init__(self, kb_dir: Path):
+        self.kb_dir = kb_dir
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        passages = load_passages(self.kb_dir) if self.kb_dir.exists() else []
+        tokens = [set(tokenize(p["text"])) for p in passages]
+        with self.lock:
+            self.passages, self.tokens = passages, tokens
+
+    def retrieve(self, question: str, k: int = 5, condition: dict = None):
+        query = set(tokenize(question))
+        with self.lock:
+            scored = [
+                (len(query & tokens) / (len(query) or 1), i)
+                for i, tokens in enumerate(self.tokens)
+                # Local sources are KB-relative; S3 URIs have a "/" before the top-level folder
+                if condition is None or matches_filter(condition, "/" + self.passages[i]["source"])
+            ]
+            scored = sorted((s for s in scored if s[0] > 0), reverse=True)[:k]
+            return [{**self.passages[i], "score": score} for score, i in scored]
+
+
+class LocalS3:
+    """Filesystem-backed subset of the S3 client: objects are files under root"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str):
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"key escapes the local store: {key}")
+        return path
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            for chunk in iter(lambda: fileobj.read(1024 * 1024), b""):
+                f.write(chunk)
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None, Config=None):
+        with open(filename, "rb") as f:
+            self.upload_fileobj(f, bucket, key)
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self._path(obj["Key"]).unlink(missing_ok=True)
+        return {}
+
+    def get_paginator(self, operation: str):
+        if operation != "list_objects_v2":
+            raise NotImplementedError(operation)
+        return self
+
+    def paginate(self, Bucket, Prefix="", Delimiter=None):
+        """Single page in list_objects_v2 shape, honoring Prefix and Delimiter"""
+        contents, common = [], set()
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file():
+                continue
+            key = path.relative_to(self.root).as_posix()
+            if not key.startswith(Prefix):
+                continue
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                common.add(Prefix + rest.split(Delimiter, 1)[0] + Delimiter)
+                continue
+            data = path.read_bytes()
+            contents.append({"Key": key, "Size": len(data), "ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+        yield {"Contents": contents, "CommonPrefixes": [{"Prefix": p} for p in sorted(common)]}
+
+
+class LocalAgentRuntime:
+    """bedrock-agent-runtime stand-in: keyword retrieval + stub generation"""
+
+    def __init__(self, retriever: KeywordRetriever, latency: float, token_latency: float, retrieve_latency: float):
+        self.retriever = retriever
+        self.latency = latency
+        self.token_latency = token_latency
+        self.retrieve_latency = retrieve_latency
+
+    def retrieve(self, knowledgeBaseId, retrievalQuery, retrievalConfiguration=None, **kwargs):
+        time.sleep(self.retrieve_latency)
+        search = (retrievalConfiguration or {}).get("vectorSearchConfiguration", {})
+        passages = self.retriever.retrieve(retrievalQuery["text"], search.get("numberOfResults", 5), search.get("filter"))
+        return {"retrievalResults": [
+            {
+                "content": {"text": p["text"]},
+                "location": {"type": "S3", "s3Location": {"uri": p["source"]}},
+                "score": p["score"],
+            }
+            for p in passages
+        ]}
+
+    def retrieve_and_generate(self, input, retrieveAndGenerateConfiguration, sessionId=None, **kwargs):
+        time.sleep(self.latency)
+        passages = self.retriever.retrieve(input["text"])
+        return {
+            "output": {"text": stub_answer(input["text"], passages)},
+            "citations": [{"retrievedReferences": [reference(p) for p in passages]}] if passages else [],
+            "sessionId": sessionId or str(uuid.uuid4()),
+        }
+
+    def retrieve_and_generate_stream(self, input, retrieveAndGenerateConfiguration, sessionId=None, **kwargs):
+        passages = self.retriever.retrieve(input["text"])
+        answer = stub_answer(input["text"], passages)
+
+        def events():
+            time.sleep(self.latency)
+            for word in answer.split(" "):
+                time.sleep(self.token_latency)
+                yield {"output": {"text": word + " "}}
+            if passages:
+                yield {"citation": {"retrievedReferences": [reference(p) for p in passages]}}
+
+        return {"stream": events(), "sessionId": sessionId or str(uuid.uuid4())}
+
+
+class LocalBedrockRuntime:
+    """bedrock-runtime stand-in for converse/converse_stream; the prompt already holds the passages"""
+
+    def __init__(self, latency: float, token_latency: float):
+        self.latency = latency
+        self.token_latency = token_latency
+
+    def _answer(self, messages):
+        prompt = messages[-1]["content"][0]["text"]
+        context, _, question = prompt.rpartition("User question:")
+        lines = [line for line in context.splitlines() if line.strip() and not line.startswith("[")]
+        question = question.replace("Answer:", "").strip()
+        return lines[0].strip() if lines else f"No information found for: {question}"
+
+    def converse(self, modelId, messages, system=None, **kwargs):
+        time.sleep(self.latency)
+        text = self._answer(messages)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+            "usage": {"inputTokens": len(tokenize(messages[-1]["content"][0]["text"])), "outputTokens": len(tokenize(text))},
+        }
+
+    def converse_stream(self, modelId, messages, system=None, **kwargs):
+        text = self._answer(messages)
+
+        def events():
+            time.sleep(self.latency)
+            for word in text.split(" "):
+                time.sleep(self.token_latency)
+                yield {"contentBlockDelta": {"delta": {"text": word + " "}}}
+            yield {"metadata": {"usage": {
+                "inputTokens": len(tokenize(messages[-1]["content"][0]["text"])),
+                "outputTokens": len(tokenize(text)),
+            }}}
+
+        return {"stream": events()}
+
+
+class LocalAgentClient:
+    """bedrock-agent stand-in: ingestion jobs complete after a fixed delay and reload the retriever"""
+
+    def __init__(self, retriever: KeywordRetriever, ingestion_seconds: float):
+        self.retriever = retriever
+        self.ingestion_seconds = ingestion_seconds
+        self.jobs = {}  # job_id -> start time
+        self.lock = threading.Lock()
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId, **kwargs):
+        job_id = uuid.uuid4().hex[:10].upper()
+        with self.lock:
+            self.jobs[job_id] = time.time()
+        return {"ingestionJob": {"ingestionJobId": job_id, "status": "STARTING"}}
+
+    def get_ingestion_job(self, knowledgeBaseId, dataSourceId, ingestionJobId):
+        with self.lock:
+            started = self.jobs[ingestionJobId]
+        if time.time() - started < self.ingestion_seconds:
+            return {"ingestionJob": {"ingestionJobId": ingestionJobId, "status": "IN_PROGRESS"}}
+        self.retriever.reload()
+        return {"ingestionJob": {"ingestionJobId": ingestionJobId, "status": "COMPLETE"}}
+
+    def list_ingestion_jobs(self, knowledgeBaseId, dataSourceId, filters=None, sortBy=None, maxResults=None, **kwargs):
+        """Completed jobs, most recently started first (the only listing the scheduler asks for)"""
+        now = time.time()
+        with self.lock:
+            done = sorted(((started, job_id) for job_id, started in self.jobs.items()
+                           if now - started >= self.ingestion_seconds), reverse=True)
+        return {"ingestionJobSummaries": [
+            {"ingestionJobId": job_id, "status": "COMPLETE"} for _, job_id in done[:maxResults]
+        ]}
+
+
+def make_local_clients(kb_dir: str, latency: float = 0.5, token_latency: float = 0.02, ingestion_seconds: float = 2,
+                       retrieve_latency: float = 0.1):
+    """Return (s3, agent_runtime, agent_client, bedrock_runtime) backed by the local filesystem"""
+    root = Path(kb_dir).resolve()
+    retriever = KeywordRetriever(root)
+    return (
+        LocalS3(root),
+        LocalAgentRuntime(retriever, latency, token_latency, retrieve_latency),
+        LocalAgentClient(retriever, ingestion_seconds),
+        LocalBedrockRuntime(latency, token_latency),
+    )
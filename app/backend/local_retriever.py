@@ -0,0 +1,240 @@
+import logging
+import os
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Local retrieval engine
+# ---------------------------
+# Embeds the local knowledge_base tree into a memory-mapped embedding store
+# persisted to disk, so /ask can fetch top-k passages in-process instead of
+# paying a Bedrock retrieval round trip on every question. Only changed files
+# are re-embedded on refresh. Dense results are fused with a BM25 keyword
+# ranking, optionally restricted to a make/model/year scope. With an S3 source,
+# each refresh first mirrors the objects whose ETag changed into the KB folder,
+# so files uploaded through /upload reach the index too. Files are fingerprinted
+# by content, so a mirror that rewrites identical files re-embeds nothing.
+
+KB_EXTENSIONS = (".txt", ".json")
+MAX_CHUNK_CHARS = 800
+RRF_K = 60  # reciprocal rank fusion constant
+S3_STATE_FILE = "s3_etags.json"  # {key: etag} of the objects mirrored into the KB folder
+# Section chunks written by data/preprocess.py ("<stem>__03_engine.txt") repeat a source file
+# the index already holds, so they are never mirrored
+CHUNK_KEY_RE = re.compile(r"__\d{2}_[^/]*\.txt$")
+
+
+def kb_fingerprint(kb_dir: Path):
+    """Return a {relative_path: md5 of the content} map of every KB source file"""
+    files = {}
+    for root, dirs, names in os.walk(kb_dir):
+        for name in sorted(names):
+            if not name.lower().endswith(KB_EXTENSIONS) or name.endswith(".metadata.json"):
+                continue
+            path = Path(root) / name
+            files[path.relative_to(kb_dir).as_posix()] = file_md5(path)
+    return files
+
+
+def file_md5(path: Path):
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS):
+    """Group blank-line separated paragraphs into chunks of at most max_chars"""
+    chunks = []
+    current = ""
+    for para in text.split("\n\n"):
+        para = para.strip()
+        if not para:
+            continue
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            current = para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_json(text: str):
+    """One passage per list item / top-level key, so each record is retrievable on its own"""
+    data = json.loads(text)
+    if isinstance(data, list):
+        return [json.dumps(item, ensure_ascii=False) for item in data]
+    if isinstance(data, dict):
+        return [json.dumps({key: value}, ensure_ascii=False) for key, value in data.items()]
+    return [text]
+
+
+def file_passages(kb_dir: Path, rel_path: str):
+    text = (kb_dir / rel_path).read_text(encoding="utf-8")
+    if rel_path.lower().endswith(".json"):
+        chunks = chunk_json(text)
+    else:
+        chunks = chunk_text(text)
+    return [{"source": rel_path, "text": chunk} for chunk in chunks]
+
+
+def load_passages(kb_dir: Path):
+    passages = []
+    for rel_path in kb_fingerprint(kb_dir):
+        passages.extend(file_passages(kb_dir, rel_path))
+    return passages
+
+
+def sync_from_s3(s3_client, bucket: str, prefix: str, kb_dir: Path, state_path: Path):
+    """
+    Mirror KB objects under prefix into kb_dir: download keys whose ETag changed since the
+    last sync and delete local files whose key was mirrored earlier and is gone now (files
+    that never came from S3 are left alone). A local file whose MD5 already equals the ETag
+    (the files baked into the image) is adopted without downloading it. Preprocessed section
+    chunks are skipped. Returns the number of files written or removed.
+    """
+    from embedding_store import file_lock
+
+    with file_lock(state_path.with_name(f".{state_path.name}.lock")):
+        synced = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else {}
+        remote = {}
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if (key.lower().endswith(KB_EXTENSIONS) and not key.endswith(".metadata.json")
+                        and not CHUNK_KEY_RE.search(key)):
+                    remote[key] = obj["ETag"].strip('"')
+
+        changed, adopted = 0, 0
+        for key, etag in remote.items():
+            path = kb_dir / key[len(prefix):]
+            if synced.get(key) == etag and path.exists():
+                continue
+            if kb_dir not in path.resolve().parents:
+                continue
+            # Single-part ETags are the content MD5; multipart ones ("<md5>-<parts>") always download
+            if path.exists() and file_md5(path) == etag:
+                synced[key] = etag
+                adopted += 1
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.tmp")
+            with open(tmp, "wb") as f:
+                s3_client.download_fileobj(bucket, key, f)
+            os.replace(tmp, path)
+            synced[key] = etag
+            changed += 1
+        for key in set(synced) - set(remote):
+            (kb_dir / key[len(prefix):]).unlink(missing_ok=True)
+            del synced[key]
+            changed += 1
+
+        if changed or adopted:
+            state_path.write_text(json.dumps(synced, indent=1), encoding="utf-8")
+            logger.info("KB mirrored from S3", extra={"fields": {"bucket": bucket, "prefix": prefix, "changed_files": changed}})
+        return changed
+
+
+class LocalRetriever:
+    def __init__(self, kb_dir: str, index_dir: str, model_name: str, dtype: str = "float16", s3_source=None):
+        from embedding_store import EmbeddingStore
+
+        self.kb_dir = Path(kb_dir).resolve()
+        self.model_name = model_name
+        self.store = EmbeddingStore(index_dir, model_name, dtype)
+        self.s3_source = s3_source  # (s3 client, bucket, key prefix) mirrored before each refresh, or None
+        self.s3_state_path = Path(index_dir).resolve() / S3_STATE_FILE
+        self.model = None
+        self.snapshot = None  # swapped as a whole on refresh; searches read it once
+        self.update_lock = threading.Lock()
+
+    @property
+    def passages(self):
+        return self.snapshot.passages if self.snapshot is not None else []
+
+    def embed(self, texts):
+        vectors = self.model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype="float32")
+
+    def load_or_build(self):
+        """Load the persisted store, re-embedding only the KB files that changed since it was built"""
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name)
+        snapshot = self.store.load()
+        if snapshot is not None:
+            self._publish(snapshot)
+        self.refresh()
+        logger.info("local retriever ready", extra={"fields": {"passages": len(self.passages)}})
+
+    def refresh(self):
+        """Bring the store in line with the KB folder (and S3); readers keep the old snapshot until the swap"""
+        with self.update_lock:
+            if self.s3_source is not None:
+                s3_client, bucket, prefix = self.s3_source
+                sync_from_s3(s3_client, bucket, prefix, self.kb_dir, self.s3_state_path)
+            files = kb_fingerprint(self.kb_dir)
+            current = self.snapshot
+            if current is not None and {p: f["fingerprint"] for p, f in current.files.items()} == files:
+                return 0
+            snapshot, changed = self.store.update(
+                current, files, lambda rel_path: file_passages(self.kb_dir, rel_path), self.embed
+            )
+            self._publish(snapshot)
+            return changed
+
+    def build(self):
+        """Re-embed the whole KB"""
+        with self.update_lock:
+            snapshot, _ = self.store.update(
+                None, kb_fingerprint(self.kb_dir), lambda rel_path: file_passages(self.kb_dir, rel_path), self.embed
+            )
+            self._publish(snapshot)
+
+    def _publish(self, snapshot):
+        from bm25 import BM25
+
+        snapshot.bm25 = BM25([p["text"] for p in snapshot.passages])
+        self.snapshot = snapshot
+
+    def retrieve(self, question: str, k: int = 5, vehicle: dict = None, category: str = None):
+        """
+        Return the top-k passages as dicts with source, text and score.
+        Dense and BM25 rankings are fused with reciprocal rank fusion; when a vehicle
+        is given, only passages in its make/model/year scope are considered, and with
+        a category ("specs/") only passages under that KB folder.
+        """
+        from vehicle_query import in_scope
+
+        if self.model is None:
+            self.load_or_build()
+        snapshot = self.snapshot
+        if snapshot is None or not snapshot.passages:
+            return []
+
+        candidates = None
+        if vehicle and vehicle.get("make"):
+            candidates = [i for i, p in enumerate(snapshot.passages) if in_scope(p["source"], vehicle)] or None
+        if category:
+            rows = candidates if candidates is not None else range(len(snapshot.passages))
+            candidates = [i for i in rows if snapshot.passages[i]["source"].startswith(category)]
+            if not candidates:
+                return []
+        pool = len(candidates) if candidates is not None else len(snapshot.passages)
+        depth = min(pool, max(k * 4, 20))
+
+        fused = {}
+        dense = snapshot.top(self.embed([question])[0], depth, candidates)
+        for ranking in (dense, snapshot.bm25.top(question, depth, candidates)):
+            for rank, idx in enumerate(ranking):
+                fused[idx] = fused.get(idx, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+        best = sorted(fused, key=fused.get, reverse=True)[:k]
+        return [{**snapshot.passages[idx], "score": fused[idx]} for idx in best]
@@ -0,0 +1,186 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+# ---------------------------
+# Metrics and structured logging
+# ---------------------------
+# Minimal in-process Prometheus registry (counters + histograms rendered in the
+# text exposition format on /metrics), timing spans around AWS calls and cache
+# lookups, and a JSON log formatter. Metrics are per process: under gunicorn
+# each worker exposes its own series.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "SlowDown", "RequestLimitExceeded"}
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{label_text(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self.lock:
+            self.values[key] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self.lock:
+            series = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self.lock:
+            for key, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{label_text(names, key + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{label_text(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{label_text(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{label_text(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUEST_SECONDS = register(Histogram(
+    "carrag_request_seconds", "HTTP request latency (time to response headers for streams)",
+    ("endpoint", "method", "status")))
+SPAN_SECONDS = register(Histogram(
+    "carrag_span_seconds", "Latency of AWS calls, cache lookups and other hot-path spans", ("span",)))
+SPAN_ERRORS = register(Counter("carrag_span_errors_total", "Spans that raised", ("span",)))
+THROTTLES = register(Counter("carrag_throttles_total", "AWS throttling errors", ("span",)))
+CACHE_LOOKUPS = register(Counter("carrag_cache_lookups_total", "Cache and fast-path lookups", ("cache", "result")))
+TOKENS = register(Counter("carrag_tokens_total", "Model tokens (estimated=\"true\" when the API reports no usage)",
+                          ("route", "direction", "estimated")))
+AWS_THROTTLED_ATTEMPTS = register(Counter(
+    "carrag_aws_throttled_attempts_total", "AWS attempts rejected with throttling (including ones retried by botocore)",
+    ("service", "operation")))
+AWS_RETRIES = register(Counter("carrag_aws_retries_total", "Retries performed by botocore", ("service", "operation")))
+CIRCUIT_STATE = register(Gauge("carrag_circuit_state", "Circuit breaker state (0 closed, 1 open, 2 half-open)", ("circuit",)))
+CIRCUIT_REJECTIONS = register(Counter(
+    "carrag_circuit_rejections_total", "Calls refused while the circuit was open", ("circuit",)))
+ADMISSION_IN_FLIGHT = register(Gauge("carrag_admission_in_flight", "Model calls holding a generation slot"))
+ADMISSION_QUEUED = register(Gauge("carrag_admission_queued", "Model calls waiting for a generation slot", ("lane",)))
+ADMISSION_REJECTIONS = register(Counter(
+    "carrag_admission_rejections_total", "Model calls shed with 429 by admission control", ("lane", "reason")))
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def is_throttle(error: Exception):
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLE_CODES or type(error).__name__ in THROTTLE_CODES
+
+
+@contextmanager
+def span(name: str):
+    """Time a block into carrag_span_seconds and the current request's breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        SPAN_ERRORS.inc(span=name)
+        if is_throttle(e):
+            THROTTLES.inc(span=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        if has_request_context():
+            spans = g.setdefault("spans", {})
+            spans[name] = round(spans.get(name, 0.0) + elapsed * 1000, 2)
+
+
+def cache_result(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# ---------------------------
+# Structured logging
+# ---------------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra={"fields": {...}} is merged into the record"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level: str = "INFO"):
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
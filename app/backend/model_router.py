@@ -0,0 +1,121 @@
+import re
+import json
+import threading
+
+# ---------------------------
+# Model routing
+# ---------------------------
+# Classifies each question as a "simple" factual lookup or a "complex"
+# multi-step question and picks the model for that route from a configurable
+# table. Latency, tokens and estimated cost are accumulated per route.
+
+# Words that signal a procedure, explanation or comparison -> large model
+COMPLEX_WORDS = {
+    "how", "why", "explain", "steps", "procedure", "troubleshoot", "diagnose", "compare",
+    "difference", "replace", "install", "reset", "should", "cause", "causes",
+}
+# A new clause that asks another question: "...is on, which oil does it take and how do I top it up"
+CLAUSE_BREAK = re.compile(
+    r"[?;]|(?:,|\band\b|\bthen\b|\balso\b)\s+(?=(?:how|what|which|why|when|where|is|are|do|does|can|should)\b)",
+    re.IGNORECASE)
+SIMPLE_MAX_WORDS = 24
+
+DEFAULT_ROUTES = {
+    "simple": {
+        "model": "anthropic.claude-3-haiku-20240307-v1:0",
+        "input_per_1k": 0.00025,
+        "output_per_1k": 0.00125,
+    },
+    "complex": {
+        "model": "anthropic.claude-3-sonnet-20240229-v1:0",
+        "input_per_1k": 0.003,
+        "output_per_1k": 0.015,
+    },
+}
+
+
+def load_routes(config: str = None, complex_model: str = None):
+    """Route table from a JSON string or file path, merged over the defaults"""
+    routes = {name: dict(route) for name, route in DEFAULT_ROUTES.items()}
+    if complex_model:
+        routes["complex"]["model"] = complex_model
+    if config:
+        if config.strip().startswith("{"):
+            overrides = json.loads(config)
+        else:
+            with open(config, encoding="utf-8") as f:
+                overrides = json.load(f)
+        for name, route in overrides.items():
+            routes.setdefault(name, {}).update(route)
+    return routes
+
+
+def tokenize(text: str):
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+def new_stats():
+    return {"requests": 0, "latency_s": 0.0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+            "estimated_input_tokens": 0, "estimated_output_tokens": 0}
+
+
+class ModelRouter:
+    def __init__(self, routes: dict, known_phrases=()):
+        self.routes = routes
+        # Warning-light keywords and spec field names: questions naming one are lookups
+        self.known_phrases = {tuple(tokenize(p)) for p in known_phrases if tokenize(p)}
+        self.stats = {name: new_stats() for name in routes}
+        self.lock = threading.Lock()
+
+    def classify(self, question: str):
+        """
+        "simple" only for a single-clause question naming a known lookup phrase with no
+        procedural or explanatory words; anything else, however short, is "complex"
+        """
+        tokens = tokenize(question)
+        if COMPLEX_WORDS & set(tokens) or len(tokens) > SIMPLE_MAX_WORDS:
+            return "complex"
+        if sum(1 for clause in CLAUSE_BREAK.split(question) if tokenize(clause)) > 1:
+            return "complex"
+        for phrase in self.known_phrases:
+            if any(tuple(tokens[i:i + len(phrase)]) == phrase for i in range(len(tokens))):
+                return "simple"
+        return "complex"
+
+    def route(self, question: str):
+        """Return (route_name, model_id) for a question"""
+        name = self.classify(question)
+        return name, self.routes[name]["model"]
+
+    def record(self, name: str, latency_s: float, input_tokens: int, output_tokens: int, estimated: bool = False):
+        """Add one call; estimated token counts (no usage reported by the API) are also totalled apart"""
+        route = self.routes[name]
+        cost = (input_tokens * route.get("input_per_1k", 0.0) + output_tokens * route.get("output_per_1k", 0.0)) / 1000
+        with self.lock:
+            stats = self.stats.setdefault(name, new_stats())
+            stats["requests"] += 1
+            stats["latency_s"] += latency_s
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += cost
+            if estimated:
+                stats["estimated_input_tokens"] += input_tokens
+                stats["estimated_output_tokens"] += output_tokens
+
+    def report(self):
+        with self.lock:
+            report = {}
+            for name, stats in self.stats.items():
+                requests = stats["requests"]
+                report[name] = {
+                    "model": self.routes[name]["model"],
+                    "requests": requests,
+                    "avg_latency_ms": round(stats["latency_s"] / requests * 1000, 1) if requests else None,
+                    "input_tokens": stats["input_tokens"],
+                    "output_tokens": stats["output_tokens"],
+                    "estimated_input_tokens": stats["estimated_input_tokens"],
+                    "estimated_output_tokens": stats["estimated_output_tokens"],
+                    "cost_usd": round(stats["cost_usd"], 6),
+                    "avg_cost_usd": round(stats["cost_usd"] / requests, 6) if requests else None,
+                }
+            return report
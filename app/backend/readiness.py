@@ -0,0 +1,50 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Startup warm-up and readiness
+# ---------------------------
+# Heavy components (embedding model, local index, reranker) load in a
+# background thread so the server accepts connections immediately. /ready
+# reports 503 until every step has finished, so a load balancer only routes
+# traffic to warm containers; requests that need a component before then
+# block on wait() instead of failing.
+
+
+class Readiness:
+    def __init__(self):
+        self.steps = {}  # name -> {"status", "seconds", "error"}
+        self.done = threading.Event()
+
+    def start(self, steps):
+        """Run (name, fn) steps in order on a background thread"""
+        for name, _ in steps:
+            self.steps[name] = {"status": "pending"}
+        threading.Thread(target=self._run, args=(steps,), daemon=True, name="warmup").start()
+
+    def _run(self, steps):
+        start = time.perf_counter()
+        for name, fn in steps:
+            step_start = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                logger.exception("warm-up step failed", extra={"fields": {"step": name}})
+                self.steps[name] = {"status": "failed", "error": str(e)}
+                continue
+            self.steps[name] = {"status": "ready", "seconds": round(time.perf_counter() - step_start, 3)}
+        logger.info("warm-up finished", extra={"fields": {"seconds": round(time.perf_counter() - start, 3)}})
+        self.done.set()
+
+    @property
+    def ready(self):
+        return self.done.is_set() and all(step["status"] == "ready" for step in self.steps.values())
+
+    def wait(self, timeout: float = None):
+        return self.done.wait(timeout)
+
+    def snapshot(self):
+        return {"ready": self.ready, "steps": dict(self.steps)}
@@ -0,0 +1,146 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_cache import normalize_question
+from metrics import cache_result
+
+# ---------------------------
+# Split retrieval pipeline ("retrieve" and "local" engines)
+# ---------------------------
+# Retrieval runs as its own step ahead of a single model call. Questions that
+# mix intents ("the oil light is on, which oil does it take and how do I top
+# it up?") get one retrieval per intent, scoped to that part of the KB
+# (specs/, warnings/, manuals/), run concurrently with the main retrieval and
+# merged, so every intent is represented in the context.
+#
+# Results are cached per normalized query and scope, and retrievals already
+# in flight are shared: a prefetch started while a request that passed
+# admission waits for its model slot is picked up when it needs the passages,
+# and concurrent identical questions cost one retrieval.
+
+INTENTS = (
+    ("spec", "specs/", {
+        "spec", "specs", "specification", "specifications", "capacity", "pressure", "psi", "torque", "size",
+        "weight", "dimensions", "horsepower", "hp", "mpg", "viscosity", "type", "oil", "coolant", "fluid",
+    }),
+    ("warning", "warnings/", {
+        "warning", "light", "lights", "lamp", "indicator", "dashboard", "symbol", "icon", "flashing", "blinking",
+    }),
+    ("manual", "manuals/", {
+        "how", "where", "reset", "replace", "change", "check", "install", "fuse", "procedure", "steps",
+        "jump", "maintenance", "schedule", "manual",
+    }),
+)
+
+
+def sub_intents(question: str):
+    """(intent, KB category) for every intent the question touches"""
+    tokens = set(normalize_question(question).split())
+    return [(name, category) for name, category, words in INTENTS if tokens & words]
+
+
+class RetrievalCache:
+    """LRU/TTL cache of retrieved passages, keyed on (normalized query, scope)"""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, passages)
+        self.generation = 0           # bumped by clear(), so retrievals started before it are not stored
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self.entries[key]
+        return None
+
+    def put(self, key, passages, generation: int):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (time.time() + self.ttl_seconds, passages)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RetrievalPipeline:
+    def __init__(self, retrieve, workers: int = 16, candidates: int = 20, sub_candidates: int = 8,
+                 split_intents: bool = True, cache: RetrievalCache = None):
+        self.retrieve = retrieve  # (query, category or None, vehicle, k) -> passages
+        self.candidates_k = candidates
+        self.sub_candidates = sub_candidates
+        self.split_intents = split_intents
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieve")
+        self.inflight = {}  # key -> Future
+        self.lock = threading.Lock()
+
+    def _jobs(self, question: str):
+        """(category, k) per retrieval: the whole KB, plus one per intent when the question mixes several"""
+        jobs = [(None, self.candidates_k)]
+        intents = sub_intents(question) if self.split_intents else []
+        if len(intents) > 1:
+            jobs += [(category, self.sub_candidates) for _, category in intents]
+        return jobs
+
+    def _start(self, question: str, category, vehicle: dict, k: int):
+        """Cached passages, or the Future of a retrieval (shared with any identical one in flight)"""
+        key = (normalize_question(question), category, json.dumps(vehicle, sort_keys=True), k)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            cache_result("retrieval", cached is not None)
+            if cached is not None:
+                return cached
+
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is None:
+                generation = self.cache.generation if self.cache is not None else 0
+                future = self.pool.submit(self._run, key, question, category, vehicle, k, generation)
+                self.inflight[key] = future
+        return future
+
+    def _run(self, key, question: str, category, vehicle: dict, k: int, generation: int):
+        try:
+            passages = self.retrieve(question, category, vehicle, k)
+            if self.cache is not None:
+                self.cache.put(key, passages, generation)
+            return passages
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def prefetch(self, question: str, vehicle: dict = None):
+        """Start the retrievals for a question without waiting for them"""
+        for category, k in self._jobs(question):
+            self._start(question, category, vehicle, k)
+
+    def candidates(self, question: str, vehicle: dict = None):
+        """Merged passages of all retrievals for the question, best score first"""
+        pending = [self._start(question, category, vehicle, k) for category, k in self._jobs(question)]
+        merged = {}
+        for result in pending:
+            passages = result if isinstance(result, list) else result.result()
+            for p in passages:
+                key = (p["source"], p["text"])
+                if key not in merged or p.get("score", 0.0) > merged[key].get("score", 0.0):
+                    merged[key] = p
+        return sorted(merged.values(), key=lambda p: p.get("score", 0.0), reverse=True)
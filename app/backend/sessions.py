@@ -0,0 +1,61 @@
+import re
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+# ---------------------------
+# Conversational sessions
+# ---------------------------
+# Server-side session map (LRU + idle TTL) so follow-up questions can build on
+# earlier turns: each session remembers the vehicle established so far and the
+# Bedrock sessionId, which lets retrieve_and_generate keep the conversation on
+# its side instead of us resending it. Sessions live in process memory, so
+# with several gunicorn workers a session is only known to the worker that
+# created it; the vehicle is also echoed to the client, which sends it back
+# so a follow-up reaching another worker keeps it.
+
+SESSION_ID_RE = re.compile(r"^[\w-]{8,64}$")
+
+
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.vehicle = {"make": None, "model": None, "year": None}
+        self.bedrock_session_id = None
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions = OrderedDict()  # session id -> (expires_at, Session)
+        self.lock = threading.Lock()
+
+    def get(self, session_id: str = None):
+        """
+        Session for a client-supplied id, extending its TTL. Unknown or expired ids
+        start a fresh session (keeping a well-formed id, so the client's next turn
+        still finds it); no id, or a malformed or non-string one, starts a session with a new one.
+        """
+        if not isinstance(session_id, str) or not SESSION_ID_RE.match(session_id):
+            session_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self.lock:
+            entry = self.sessions.pop(session_id, None)
+            session = entry[1] if entry and entry[0] > now else Session(session_id)
+            self.sessions[session_id] = (now + self.ttl_seconds, session)
+            self._evict(now)
+        return session
+
+    def _evict(self, now: float):
+        # Entries are in last-used order, so expired ones are at the front
+        while self.sessions:
+            expires_at, _ = next(iter(self.sessions.values()))
+            if expires_at > now and len(self.sessions) <= self.max_sessions:
+                break
+            self.sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,122 @@
+import re
+import logging
+import json
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Spec table lookup
+# ---------------------------
+# Answers exact-value spec questions ("torque of the 2020 Mazda 3") from the
+# columnar (make, model, year, section, field, value) table compiled by
+# data/preprocess.py. Specs vary by year, so make, model and year must all be known.
+
+# Procedural questions ("how do I check the engine oil") are left to RAG
+PROCEDURAL_WORDS = {"how", "why", "replace", "change", "check", "install"}
+# Generic field names only match next to their section ("engine type", "tire pressure front")
+AMBIGUOUS_FIELDS = {"type", "front", "rear"}
+# A one-word field or section ("power", "engine") only answers a question that asks for a value
+# and uses the word on its own: "does it have power steering" is not a power question
+SPEC_INTENT_WORDS = {"what", "which", "much", "many", "spec", "specification", "value", "rating",
+                     "hp", "kw", "nm", "psi", "mm", "kg"}
+FIELD_FOLLOW_WORDS = {"of", "for", "on", "in", "is", "does", "do", "the", "my", "a", "an", "and", "at", "with"}
+
+
+def spec_tokens(text: str):
+    tokens = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    return [t[:-1] if len(t) > 3 and t.endswith("s") else t for t in tokens]
+
+
+def contains_phrase(tokens, phrase):
+    return any(tuple(tokens[i:i + len(phrase)]) == phrase for i in range(len(tokens)))
+
+
+def standalone(tokens, word: str, allowed):
+    """True if word occurs at the end of the question or followed by one of `allowed` or a number"""
+    return any(
+        token == word and (i + 1 == len(tokens) or tokens[i + 1] in allowed or tokens[i + 1].isdigit())
+        for i, token in enumerate(tokens)
+    )
+
+
+class SpecTable:
+    def __init__(self, table_path: str):
+        self.table_path = Path(table_path)
+        self.rows = {}  # (make, model, year) lowercased -> list of (section, field, value)
+        self.vocabulary = set()  # words of all field and section names
+
+    def load(self):
+        if not self.table_path.exists():
+            logger.warning("spec table not found, run data/preprocess.py to build it", extra={"fields": {"path": str(self.table_path)}})
+            return self
+
+        table = json.loads(self.table_path.read_text(encoding="utf-8"))
+        for make, model, year, section, field, value in zip(
+                table["make"], table["model"], table["year"], table["section"], table["field"], table["value"]):
+            if make and model and year:
+                self.rows.setdefault((make.lower(), model.lower(), year), []).append((section, field, value))
+                self.vocabulary.update(t for t in spec_tokens(f"{section} {field}") if t.isalpha() and len(t) > 2)
+        logger.info("spec table ready", extra={"fields": {"rows": sum(len(r) for r in self.rows.values()), "vehicles": len(self.rows)}})
+        return self
+
+    def answer(self, question: str, vehicle: dict):
+        """Return the matching spec value(s) for a fully identified vehicle, otherwise None"""
+        if not (vehicle.get("make") and vehicle.get("model") and vehicle.get("year")):
+            return None
+        rows = self.rows.get((vehicle["make"].lower(), vehicle["model"].lower(), vehicle["year"]))
+        tokens = spec_tokens(question)
+        if not rows or PROCEDURAL_WORDS & set(tokens):
+            return None
+
+        # Prefer the most specific field name; fall back to a whole section ("tire pressure")
+        best_len, matched, phrases, conflicting = 0, [], set(), False
+        for section, field, value in rows:
+            phrase = tuple(spec_tokens(field))
+            if field == section or not phrase or not contains_phrase(tokens, phrase):
+                continue
+            if " ".join(phrase) in AMBIGUOUS_FIELDS:
+                section_phrase = tuple(spec_tokens(section))
+                if not contains_phrase(tokens, section_phrase + phrase):
+                    continue
+                # "engine type of oil": another field word means the question is about something else
+                if (self.vocabulary & set(tokens)) - set(section_phrase + phrase):
+                    conflicting = True
+                    continue
+                phrase = section_phrase + phrase
+            if len(phrase) > best_len:
+                best_len, matched, phrases = len(phrase), [(section, field, value)], {phrase}
+            elif len(phrase) == best_len:
+                matched.append((section, field, value))
+                phrases.add(phrase)
+
+        if conflicting and not matched:
+            return None
+        if not matched:
+            for section, field, value in rows:
+                phrase = tuple(spec_tokens(section))
+                if contains_phrase(tokens, phrase):
+                    matched.append((section, field, value))
+                    phrases.add(phrase)
+        if not matched:
+            return None
+
+        words = [phrase[0] for phrase in phrases if len(phrase) == 1]
+        if words:
+            allowed = FIELD_FOLLOW_WORDS | set(spec_tokens(f"{vehicle['make']} {vehicle['model']}"))
+            if not SPEC_INTENT_WORDS & set(tokens) or not all(standalone(tokens, w, allowed) for w in words):
+                return None
+
+        # Fields repeated across sections (e.g. "Brake fluid" under Fluids and Maintenance) name their section
+        repeated = len({field for _, field, _ in matched}) < len(matched)
+        parts = []
+        for section, field, value in matched:
+            if field == section:
+                parts.append(value)
+            elif repeated:
+                parts.append(f"{field} ({section}): {value}")
+            else:
+                parts.append(f"{field}: {value}")
+
+        name = f"{vehicle['year']} {vehicle['make']} {vehicle['model']}"
+        return f"{name}: " + "; ".join(parts) + "."
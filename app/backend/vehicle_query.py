@@ -0,0 +1,160 @@
+import re
+import json
+from pathlib import Path
+
+# ---------------------------
+# Vehicle query parsing and retrieval scoping
+# ---------------------------
+# Extracts make/model/year from a question using the vocabulary of the KB tree
+# (manuals/<make>/<model>/<year>, specs/<make>/<model>, manufacturers/<make>,
+# tire_pressure keys), and turns it into a path scope for local retrieval or a
+# Bedrock metadata filter on the source URI.
+
+YEAR_RE = re.compile(r"\b(19[5-9]\d|20\d{2})\b")
+
+# Datasets that apply to every vehicle and are never filtered out
+SHARED_SOURCES = ("warnings/", "tire_pressure/")
+
+
+def tokenize(text: str):
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+class VehicleParser:
+    def __init__(self, kb_dir: str):
+        self.kb_dir = Path(kb_dir)
+        self.makes = {}   # lowercase make -> canonical make
+        self.models = {}  # tuple of model tokens -> set of canonical (make, model)
+
+    def _add(self, make: str, model: str = None):
+        self.makes[make.lower()] = make
+        if model:
+            self.models.setdefault(tuple(tokenize(model)), set()).add((make, model))
+
+    def build(self):
+        for category in ("manuals", "specs"):
+            base = self.kb_dir / category
+            if not base.is_dir():
+                continue
+            for make_dir in base.iterdir():
+                if not make_dir.is_dir():
+                    continue
+                self._add(make_dir.name)
+                for model_dir in make_dir.iterdir():
+                    if model_dir.is_dir():
+                        self._add(make_dir.name, model_dir.name)
+
+        manufacturers = self.kb_dir / "manufacturers"
+        if manufacturers.is_dir():
+            for make_dir in manufacturers.iterdir():
+                if make_dir.is_dir():
+                    self._add(make_dir.name)
+
+        pressures = self.kb_dir / "tire_pressure" / "tire_pressures.json"
+        if pressures.exists():
+            for vehicle in json.loads(pressures.read_text(encoding="utf-8")):
+                make, model, _ = vehicle.split("_", 2)
+                self._add(make, model)
+        return self
+
+    def parse(self, question: str):
+        """Return {"make", "model", "year"} with None for anything not (unambiguously) mentioned"""
+        tokens = tokenize(question)
+        token_set = set(tokens)
+
+        make = next((self.makes[t] for t in tokens if t in self.makes), None)
+
+        matches = set()
+        for phrase, vehicles in self.models.items():
+            if not any(tuple(tokens[i:i + len(phrase)]) == phrase for i in range(len(tokens))):
+                continue
+            for vehicle_make, model in vehicles:
+                # Purely numeric models ("3") are too ambiguous without the make
+                if phrase[0].isdigit() and vehicle_make.lower() not in token_set:
+                    continue
+                if make is None or make == vehicle_make:
+                    matches.add((vehicle_make, model))
+
+        model = None
+        if len(matches) == 1:
+            make, model = next(iter(matches))
+
+        year_match = YEAR_RE.search(question)
+        return {"make": make, "model": model, "year": year_match.group(1) if year_match else None}
+
+
+def in_scope(source: str, vehicle: dict):
+    """True if a KB-relative source path is relevant to the parsed vehicle"""
+    if not vehicle.get("make"):
+        return True
+    if source.startswith(SHARED_SOURCES):
+        return True
+
+    path = f"/{source.lower()}"
+    if path.startswith(f"/manufacturers/{vehicle['make'].lower()}/"):
+        return True
+    folder = f"/{vehicle['make']}/{vehicle['model']}/" if vehicle.get("model") else f"/{vehicle['make']}/"
+    if folder.lower() not in path:
+        return False
+    return not vehicle.get("year") or vehicle["year"] in path
+
+
+def bedrock_filter(vehicle: dict):
+    """Bedrock retrieval filter on the S3 source URI equivalent to in_scope, or None"""
+    if not vehicle.get("make"):
+        return None
+
+    def contains(value):
+        return {"stringContains": {"key": "x-amz-bedrock-kb-source-uri", "value": value}}
+
+    folder = f"/{vehicle['make']}/{vehicle['model']}/" if vehicle.get("model") else f"/{vehicle['make']}/"
+    vehicle_filter = contains(folder)
+    if vehicle.get("year"):
+        vehicle_filter = {"andAll": [vehicle_filter, contains(vehicle["year"])]}
+
+    return {"orAll": [
+        vehicle_filter,
+        contains(f"/manufacturers/{vehicle['make']}/"),
+        *[contains(f"/{shared}") for shared in SHARED_SOURCES],
+    ]}
+
+
+def category_filter(vehicle: dict, category: str = None):
+    """bedrock_filter narrowed to one KB folder ("specs/") when a category is given, or None"""
+    vehicle_scope = bedrock_filter(vehicle)
+    if category is None:
+        return vehicle_scope
+    category_scope = {"stringContains": {"key": "x-amz-bedrock-kb-source-uri", "value": f"/{category}"}}
+    return category_scope if vehicle_scope is None else {"andAll": [vehicle_scope, category_scope]}
+
+
+def merge_vehicle(context: dict, parsed: dict):
+    """Vehicle for a follow-up question: what the question names, completed from the conversation context"""
+    if not context or not context.get("make"):
+        return parsed
+    if parsed.get("make") and parsed["make"] != context["make"]:
+        return parsed
+    if parsed.get("model") and parsed["model"] != context.get("model"):
+        # Another model of the same make: the earlier year does not carry over
+        return parsed
+    return {
+        "make": context["make"],
+        "model": parsed.get("model") or context.get("model"),
+        "year": parsed.get("year") or context.get("year"),
+    }
+
+
+def vehicle_label(vehicle: dict):
+    """Display name such as "2020 Toyota Camry" (unknown parts are left out)"""
+    return " ".join(vehicle[part] for part in ("year", "make", "model") if vehicle.get(part))
+
+
+def contextual_question(question: str, parsed: dict, vehicle: dict):
+    """
+    The question with the session vehicle appended when the question itself does not
+    name all of it, e.g. "and the rear tires? (2020 Toyota Camry)". Downstream parsing,
+    fast-path lookups, cache keys and retrieval then see the full vehicle.
+    """
+    if not vehicle.get("make") or vehicle == parsed:
+        return question
+    return f"{question} ({vehicle_label(vehicle)})"
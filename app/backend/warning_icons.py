@@ -0,0 +1,178 @@
+import io
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Warning-light icon index
+# ---------------------------
+# Perceptual hashes (DCT pHash + gradient dHash, 64 bits each) of the reference
+# icons in warnings/warning_lights_images/, precomputed into INDEX_DIR and
+# matched by Hamming distance, so a photo of a dashboard symbol maps to
+# warning_lights_full.json ids in about a millisecond on CPU.
+#
+# Reference icons are named after the warning id: <id>.png, or several views
+# under <id>/*.png. Images are normalized before hashing (glyph cropped,
+# polarity fixed so the glyph is bright on dark), which makes a lit symbol in
+# a photo comparable with a dark-on-white reference drawing.
+
+IMAGES_DIR = Path("warnings") / "warning_lights_images"
+WARNINGS_FILE = Path("warnings") / "warning_lights_full.json"
+INDEX_FILE = "warning_icons.json"
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
+HASH_BITS = 64
+
+# Bedrock converse image formats
+BEDROCK_FORMATS = {"PNG": "png", "JPEG": "jpeg", "GIF": "gif", "WEBP": "webp"}
+
+
+def dct_matrix(n: int):
+    k = np.arange(n)[:, None]
+    return np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+
+
+DCT_32 = dct_matrix(32)
+
+
+def open_image(data: bytes):
+    """Decode uploaded bytes; raises ValueError for anything that is not an image"""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"not a readable image: {e}") from e
+    return image
+
+
+def bedrock_image(image: Image.Image, data: bytes):
+    """(format, bytes) for a converse image block; formats Bedrock does not take are re-encoded as PNG"""
+    if image.format in BEDROCK_FORMATS:
+        return BEDROCK_FORMATS[image.format], data
+    out = io.BytesIO()
+    image.convert("RGBA").save(out, "PNG")
+    return "png", out.getvalue()
+
+
+def glyph(image: Image.Image):
+    """Grayscale icon cropped to its glyph, bright on dark, padded to a square"""
+    image = ImageOps.exif_transpose(image)
+    alpha = None
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        alpha = image.convert("RGBA").getchannel("A")
+    if alpha is not None and alpha.getextrema()[0] < alpha.getextrema()[1]:
+        # Transparent reference icons: the alpha channel is the glyph
+        gray = alpha
+    else:
+        gray = ImageOps.autocontrast(image.convert("L"))
+        if np.asarray(gray).mean() > 127:
+            gray = ImageOps.invert(gray)
+
+    # Binarized, so a glowing, blurred symbol and a crisp drawing hash alike
+    gray = gray.point(lambda v: 255 if v > 127 else 0)
+    box = gray.getbbox()
+    if box:
+        gray = gray.crop(box)
+    side = max(gray.size)
+    square = Image.new("L", (side, side), 0)
+    square.paste(gray, ((side - gray.width) // 2, (side - gray.height) // 2))
+    return square
+
+
+def bits_to_int(bits: np.ndarray):
+    return int("".join("1" if b else "0" for b in bits.ravel()), 2)
+
+
+def phash(square: Image.Image):
+    pixels = np.asarray(square.resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    low = (DCT_32 @ pixels @ DCT_32.T)[:8, :8].ravel()
+    return bits_to_int(low > np.median(low[1:]))
+
+
+def dhash(square: Image.Image):
+    pixels = np.asarray(square.resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hashes(image: Image.Image):
+    square = glyph(image)
+    return phash(square), dhash(square)
+
+
+class IconIndex:
+    def __init__(self, kb_dir: str, index_dir: str):
+        self.kb_dir = Path(kb_dir)
+        self.index_path = Path(index_dir) / INDEX_FILE
+        self.warnings = {}  # id -> warning_lights_full.json record
+        self.icons = []     # (warning id, reference file, phash, dhash)
+
+    def _reference_files(self):
+        base = self.kb_dir / IMAGES_DIR
+        if not base.is_dir():
+            return []
+        files = []
+        for path in sorted(base.rglob("*")):
+            if path.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            rel = path.relative_to(base)
+            warning_id = rel.parts[0] if len(rel.parts) > 1 else path.stem
+            if warning_id not in self.warnings:
+                logger.warning("reference icon for unknown warning id skipped", extra={"fields": {"file": str(rel)}})
+                continue
+            files.append((warning_id, rel, path))
+        return files
+
+    def load_or_build(self):
+        """Load the precomputed hashes, rehashing only if the reference icons changed"""
+        warnings_path = self.kb_dir / WARNINGS_FILE
+        if warnings_path.exists():
+            self.warnings = {w["id"]: w for w in json.loads(warnings_path.read_text(encoding="utf-8"))}
+
+        files = self._reference_files()
+        fingerprint = [[str(rel), path.stat().st_size, path.stat().st_mtime_ns] for _, rel, path in files]
+        if self.index_path.exists():
+            saved = json.loads(self.index_path.read_text(encoding="utf-8"))
+            if saved.get("fingerprint") == fingerprint:
+                self.icons = [(i["id"], i["file"], int(i["phash"], 16), int(i["dhash"], 16)) for i in saved["icons"]]
+                logger.info("warning icon index loaded", extra={"fields": {"icons": len(self.icons)}})
+                return self
+
+        self.icons = []
+        for warning_id, rel, path in files:
+            try:
+                with Image.open(path) as image:
+                    self.icons.append((warning_id, str(rel), *image_hashes(image)))
+            except OSError as e:
+                logger.warning("reference icon unreadable", extra={"fields": {"file": str(rel), "error": str(e)}})
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path.write_text(json.dumps({
+            "fingerprint": fingerprint,
+            "icons": [{"id": i, "file": f, "phash": f"{p:016x}", "dhash": f"{d:016x}"} for i, f, p, d in self.icons],
+        }), encoding="utf-8")
+        if not self.icons:
+            logger.warning("no reference warning icons found", extra={"fields": {"dir": str(self.kb_dir / IMAGES_DIR)}})
+        logger.info("warning icon index built", extra={"fields": {"icons": len(self.icons), "warnings": len(self.warnings)}})
+        return self
+
+    def match(self, image: Image.Image, k: int = 3):
+        """
+        Closest warning ids, best first: [{"id", "name_en", "confidence"}]. Confidence is
+        1 for identical hashes and 0 at the distance of unrelated images (half the bits).
+        """
+        query_p, query_d = image_hashes(image)
+        best = {}
+        for warning_id, _, p, d in self.icons:
+            distance = ((query_p ^ p).bit_count() + (query_d ^ d).bit_count()) / (2 * HASH_BITS)
+            best[warning_id] = min(distance, best.get(warning_id, 1.0))
+
+        ranked = sorted(best.items(), key=lambda item: item[1])[:k]
+        return [
+            {"id": warning_id, "name_en": self.warnings[warning_id].get("name_en"),
+             "confidence": round(max(0.0, 1 - 2 * distance), 3)}
+            for warning_id, distance in ranked
+        ]
@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from embedding_store import EmbeddingStore  # noqa: E402
+
+# ---------------------------
+# Embedding store benchmark
+# ---------------------------
+# Compares the memory-mapped float16 and int8 stores against an exact flat
+# float32 search: recall@k, matrix size (what a full scan maps into RAM),
+# resident memory growth and query latency. Uses synthetic clustered vectors
+# by default, or real embeddings saved with np.save (--vectors).
+#
+#   python bench_embeddings.py --rows 200000 --dim 384 --queries 200
+
+
+def synthetic(rows: int, dim: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.5 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(values, pct: float):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def build_store(store_dir: str, vectors: np.ndarray, dtype: str):
+    """Write vectors through EmbeddingStore.update (one 'file' per row) and return the snapshot"""
+    files = {f"doc-{i}": [i] for i in range(len(vectors))}
+    store = EmbeddingStore(store_dir, "bench", dtype)
+    snapshot, _ = store.update(
+        None, files,
+        lambda path: [{"source": path, "text": path.split("-", 1)[1]}],
+        lambda texts: vectors[[int(t) for t in texts]]
+    )
+    return snapshot
+
+
+def run(vectors: np.ndarray, queries: np.ndarray, k: int):
+    # Ground truth: exact float32 inner product
+    exact, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        scores = vectors @ q
+        best = np.argpartition(-scores, k - 1)[:k]
+        latencies.append(time.perf_counter() - start)
+        exact.append(set(best.tolist()))
+    results = [{
+        "variant": "flat_float32",
+        "matrix_mb": round(vectors.nbytes / 1e6, 1),
+        "recall_at_k": 1.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }]
+
+    for dtype in ("float16", "int8"):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_start = time.perf_counter()
+            snapshot = build_store(tmp, vectors, dtype)
+            build_s = time.perf_counter() - build_start
+
+            rss_before = rss_mb()
+            hits, latencies = 0, []
+            for q, truth in zip(queries, exact):
+                start = time.perf_counter()
+                found = snapshot.top(q, k)
+                latencies.append(time.perf_counter() - start)
+                hits += len(truth & set(found))
+            rss_after = rss_mb()
+
+            matrix_bytes = os.path.getsize(os.path.join(snapshot.path, "vectors.npy"))
+            scales_path = os.path.join(snapshot.path, "scales.npy")
+            if os.path.exists(scales_path):
+                matrix_bytes += os.path.getsize(scales_path)
+            results.append({
+                "variant": f"mmap_{dtype}",
+                "matrix_mb": round(matrix_bytes / 1e6, 1),
+                "recall_at_k": round(hits / (len(queries) * k), 4),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+                "build_s": round(build_s, 2),
+            })
+            del snapshot
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall / RAM / latency of the embedding store vs flat float32")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vectors", help=".npy file of normalized float32 embeddings instead of synthetic data")
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = synthetic(args.rows, args.dim, args.clusters)
+    # Queries: perturbed copies of random stored vectors
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    report = {"rows": len(vectors), "dim": vectors.shape[1], "k": args.k, "results": run(vectors, queries, args.k)}
+    print(json.dumps(report, indent=2))
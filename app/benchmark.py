@@ -0,0 +1,236 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest import percentile
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from spec_lookup import AMBIGUOUS_FIELDS
+
+# ---------------------------
+# End-to-end benchmark suite
+# ---------------------------
+# Drives the Flask app in-process against the offline provider (stubbed S3 and
+# Bedrock with injectable latency), one endpoint per child process so peak RSS
+# is per endpoint. /ask and /ask_stream replay the recorded question mix in
+# bench_questions.json. Results are written as JSON so runs can be diffed
+# between commits:
+#
+#   python benchmark.py                                  # -> bench_results/<commit>.json
+#   python benchmark.py --compare bench_results/abc1234.json
+#   python benchmark.py --record                         # regenerate bench_questions.json
+
+HERE = Path(__file__).resolve().parent
+KB_DIR = HERE.parent / "data" / "knowledge_base"
+QUESTIONS_FILE = HERE / "bench_questions.json"
+RESULTS_DIR = HERE / "bench_results"
+SCENARIOS = ("ask", "ask_stream", "folders", "upload")
+
+# Applied unless already set in the environment, so any backend setting can be benchmarked
+BENCH_ENV = {
+    "PROVIDER": "local",
+    "RETRIEVAL_ENGINE": "retrieve",
+    "RERANK_MODEL": "",
+    "LOCAL_LATENCY_MS": "300",
+    "LOCAL_TOKEN_LATENCY_MS": "10",
+    "LOCAL_RETRIEVE_LATENCY_MS": "100",
+    "LOCAL_INGESTION_SECONDS": "2",
+    "LOG_LEVEL": "warning",
+}
+
+
+# ---------------------------
+# Question mix
+# ---------------------------
+def record_questions(kb_dir: Path, seed: int = 0):
+    """Deterministic question mix over the warnings, specs and manuals datasets"""
+    questions = []
+
+    for w in json.loads((kb_dir / "warnings" / "warning_lights_full.json").read_text(encoding="utf-8")):
+        questions.append({"dataset": "warnings", "question": f"What does the {w['name_en']} warning light mean?"})
+        questions.append({"dataset": "warnings", "question": f"Is it safe to drive with the {w['name_en']} light on?"})
+
+    for path in sorted((kb_dir / "specs").rglob("*_specs.txt")):
+        title = path.read_text(encoding="utf-8").splitlines()[0]
+        match = re.match(r"(\w+) (.+) \((\d{4})\)", title)
+        if not match:
+            continue
+        make, model, year = match.groups()
+        section = ""
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.endswith(":") and not line.startswith("-"):
+                section = line[:-1].lower()
+            elif line.startswith("- ") and ":" in line:
+                field = line[2:].split(":", 1)[0].lower()
+                # The spec table only answers generic fields ("front", "type") named with their section
+                if field in AMBIGUOUS_FIELDS:
+                    field = f"{section} {field}"
+                questions.append({"dataset": "specs", "question": f"What is the {field} of the {year} {make} {model}?"})
+
+    for path in sorted((kb_dir / "manuals").rglob("*.txt")):
+        if path.name == "README.txt":
+            continue
+        make, model, year = path.relative_to(kb_dir / "manuals").parts[:3]
+        vehicle = f"{year} {make} {model}"
+        for field in re.findall(r"^- ([^:\n]+):", path.read_text(encoding="utf-8"), re.MULTILINE):
+            questions.append({"dataset": "manuals", "question": f"What {field.lower()} does the {vehicle} use?"})
+        for topic in ("check the engine oil level", "reset the tire pressure warning", "jump start the battery"):
+            questions.append({"dataset": "manuals", "question": f"How do I {topic} on the {vehicle}?"})
+
+    random.Random(seed).shuffle(questions)
+    return questions
+
+
+# ---------------------------
+# Child: one endpoint, in-process
+# ---------------------------
+def run_scenario(scenario: str, concurrency: int, total: int, questions):
+    sys.path.insert(0, str(HERE / "backend"))
+    import app as backend
+
+    backend.readiness.wait()
+    rss_startup = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    local = threading.local()
+    payload = b"benchmark upload line\n" * 200  # ~4 KB per file
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = backend.app.test_client()
+        return local.client
+
+    def call(i: int):
+        c = client()
+        start = time.perf_counter()
+        if scenario == "ask":
+            res = c.post("/ask", json={"question": questions[i % len(questions)]["question"]})
+        elif scenario == "ask_stream":
+            res = c.post("/ask_stream", json={"question": questions[i % len(questions)]["question"]})
+            res.get_data()
+        elif scenario == "folders":
+            res = c.get("/folders")
+        else:
+            files = [(io.BytesIO(payload), f"bench_{i}_{n}.txt") for n in range(5)]
+            res = c.post("/upload", data={"folder": "bench/upload", "files": files}, content_type="multipart/form-data")
+        ok = res.status_code == 200
+        res.close()
+        return ok, time.perf_counter() - start
+
+    # One untimed request first: lazy first-use work (e.g. the /folders listing) is not part of the steady state
+    call(0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [lat for ok, lat in results if ok]
+    report = {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": sum(1 for ok, _ in results if not ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "rss_after_startup_mb": round(rss_startup, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if latencies:
+        report.update({
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        })
+    return report
+
+
+# ---------------------------
+# Parent: isolated environment, one child per endpoint
+# ---------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(scenarios, concurrency: int, total: int):
+    env = dict(os.environ)
+    for key, value in BENCH_ENV.items():
+        env.setdefault(key, value)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scenario in scenarios:
+            # Fresh copy of the KB per endpoint: uploads write into it through the local S3 stand-in
+            kb_copy = Path(tmp) / scenario / "knowledge_base"
+            shutil.copytree(KB_DIR, kb_copy)
+            child_env = {**env, "KB_LOCAL_DIR": str(kb_copy), "INDEX_DIR": str(Path(tmp) / scenario / "index")}
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", scenario, "--concurrency", str(concurrency), "--requests", str(total)],
+                env=child_env, capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                results[scenario] = {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+            else:
+                results[scenario] = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{scenario}: {json.dumps(results[scenario])}", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: env[key] for key in BENCH_ENV} | {"concurrency": concurrency, "requests": total},
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict):
+    """Print the relative change of every latency/throughput/RSS figure"""
+    print(f"{old['commit']} -> {new['commit']}")
+    for scenario, result in new["results"].items():
+        before = old["results"].get(scenario, {})
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "peak_rss_mb"):
+            if metric in result and before.get(metric):
+                change = (result[metric] - before[metric]) / before[metric] * 100
+                print(f"  {scenario:<11} {metric:<15} {before[metric]:>10} -> {result[metric]:>10}  ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end /ask, /ask_stream, /folders and /upload benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", help="result file (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="previous result file to diff against")
+    parser.add_argument("--record", action="store_true", help="regenerate bench_questions.json from the KB")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.record:
+        mix = record_questions(KB_DIR)
+        QUESTIONS_FILE.write_text(json.dumps(mix, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"recorded {len(mix)} questions to {QUESTIONS_FILE}")
+        sys.exit(0)
+
+    if args.child:
+        mix = json.loads(QUESTIONS_FILE.read_text(encoding="utf-8"))
+        print(json.dumps(run_scenario(args.child, args.concurrency, args.requests, mix)))
+        sys.exit(0)
+
+    report = run_suite(args.scenarios.split(","), args.concurrency, args.requests)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
@@ -0,0 +1,26 @@
+import os
+import multiprocessing
+
+# ---------------------------
+# Production serving (gunicorn)
+# ---------------------------
+# Threaded workers: each /ask spends most of its time waiting on Bedrock,
+# so a few processes with many threads each keep concurrency high.
+# Run from the app directory: gunicorn -c gunicorn.conf.py
+
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+wsgi_app = "app:app"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 4)))
+threads = int(os.environ.get("WEB_THREADS", "32"))
+
+# Generation can take several seconds and /ask_stream keeps the connection open
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
@@ -0,0 +1,83 @@
+import json
+import time
+import argparse
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------
+# Load test for /ask
+# ---------------------------
+# Fires questions at a running backend from many concurrent askers and
+# reports throughput and latency percentiles.
+#
+#   python loadtest.py --url http://localhost:8000 --concurrency 50 --requests 500
+
+DEFAULT_QUESTIONS = [
+    "What does the oil light mean?",
+    "tire pressure Corolla 2018",
+    "What does the seatbelt light mean?",
+    "What engine oil does the 2018 Toyota Corolla use?",
+    "What is the torque of the Mazda 3 2020?",
+    "Is it safe to drive with the ABS light on?",
+]
+
+
+def ask(url: str, question: str):
+    body = json.dumps({"question": question}).encode("utf-8")
+    req = urllib.request.Request(f"{url}/ask", data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as res:
+            res.read()
+            ok = res.status == 200
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def percentile(values, pct: float):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run(url: str, concurrency: int, total: int, questions):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: ask(url, questions[i % len(questions)]), range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [lat for ok, lat in results if ok]
+    errors = sum(1 for ok, _ in results if not ok)
+    report = {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+    }
+    if latencies:
+        report.update({
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /ask load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--questions", help="file with one question per line")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    print(json.dumps(run(args.url, args.concurrency, args.requests, questions), indent=2))
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import argparse
+import importlib.util
+
+# ---------------------------
+# Build-time artifact baking
+# ---------------------------
+# Precomputes everything the backend would otherwise build or download on
+# its first start, so containers built with it come up warm:
+#   models    - embedding and reranker weights, cached under HF_HOME
+#   artifacts - compiled spec table (data/preprocess.py), the local KB index and
+#               the warning-light icon hashes
+#
+#   python prebuild.py                 # both
+#   python prebuild.py models          # e.g. as an early, rarely invalidated Docker layer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, "backend")
+# The repo keeps data/ next to app/; the image copies it to /app/data and sets RAG_DATA_DIR
+DATA_DIR = os.environ.get("RAG_DATA_DIR", os.path.join(HERE, "..", "data"))
+
+# Same defaults as backend/app.py
+KB_LOCAL_DIR = os.environ.get("KB_LOCAL_DIR", os.path.join(DATA_DIR, "knowledge_base"))
+INDEX_DIR = os.environ.get("INDEX_DIR", os.path.join(HERE, "index"))
+SPEC_TABLE_PATH = os.environ.get("SPEC_TABLE_PATH", os.path.join(DATA_DIR, "build", "specs_table.json"))
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_DTYPE = os.environ.get("EMBED_DTYPE", "float16").lower()
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
+def timed(name: str, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{name}: {time.perf_counter() - start:.1f}s")
+
+
+def download_models():
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+    timed(f"embedding model {EMBED_MODEL}", lambda: SentenceTransformer(EMBED_MODEL))
+    if RERANK_MODEL:
+        timed(f"reranker {RERANK_MODEL}", lambda: CrossEncoder(RERANK_MODEL))
+
+
+def build_spec_table():
+    spec = importlib.util.spec_from_file_location("preprocess", os.path.join(DATA_DIR, "preprocess.py"))
+    preprocess = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(preprocess)
+    out = os.path.join(os.path.dirname(SPEC_TABLE_PATH), "knowledge_base")
+    preprocess.preprocess_kb(KB_LOCAL_DIR, out, SPEC_TABLE_PATH)
+
+
+def build_index():
+    sys.path.insert(0, BACKEND_DIR)
+    from local_retriever import LocalRetriever
+
+    LocalRetriever(KB_LOCAL_DIR, INDEX_DIR, EMBED_MODEL, EMBED_DTYPE).load_or_build()
+
+
+def build_icon_index():
+    sys.path.insert(0, BACKEND_DIR)
+    from warning_icons import IconIndex
+
+    IconIndex(KB_LOCAL_DIR, INDEX_DIR).load_or_build()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute model weights, spec table and KB index")
+    parser.add_argument("steps", nargs="*", choices=["models", "artifacts"], default=["models", "artifacts"])
+    args = parser.parse_args()
+
+    if "models" in args.steps:
+        download_models()
+    if "artifacts" in args.steps:
+        timed(f"spec table {SPEC_TABLE_PATH}", build_spec_table)
+        timed(f"KB index {INDEX_DIR}", build_index)
+        timed(f"warning icon index {INDEX_DIR}", build_icon_index)
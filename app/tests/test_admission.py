@@ -0,0 +1,65 @@
+import sys
+import time
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_on_queued_runs_without_the_lock():
+    admission = AdmissionController(max_concurrent=1, max_wait_seconds=5)
+    admission.acquire("interactive")
+    hook_ran = threading.Event()
+
+    def on_queued():
+        # Another thread can use the controller while the hook runs
+        releaser = threading.Thread(target=admission.release)
+        releaser.start()
+        releaser.join(2)
+        assert not releaser.is_alive(), "on_queued() was called with the admission lock held"
+        hook_ran.set()
+
+    admission.acquire("interactive", on_queued)
+    assert hook_ran.is_set()
+    assert admission.in_flight == 1
+    assert admission.waiting == []
+
+
+def wait_queued(admission, count):
+    for _ in range(500):
+        with admission.cond:
+            if len(admission.waiting) == count:
+                return
+        time.sleep(0.01)
+    raise AssertionError(f"expected {count} queued calls, got {admission.waiting}")
+
+
+def test_full_queue_rejects_its_lane_only():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait_seconds=5)
+    admission.acquire("batch")
+    waiter = threading.Thread(target=admission.acquire, args=("batch",))
+    waiter.start()
+    wait_queued(admission, 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("batch")
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+
+    # A queued batch call is not ahead of a safety call, so that one still gets in line
+    safety = threading.Thread(target=admission.acquire, args=("safety",))
+    safety.start()
+    wait_queued(admission, 2)
+
+    admission.release()
+    safety.join(5)
+    assert not safety.is_alive()
+    admission.release()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    admission.release()
+    assert admission.in_flight == 0
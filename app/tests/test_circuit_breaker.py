@@ -0,0 +1,56 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from aws_clients import CircuitBreaker, CircuitOpenError
+
+
+class ClientError(Exception):
+    """Stand-in for botocore's ClientError"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+def fail(breaker, code="ThrottlingException"):
+    with pytest.raises(ClientError):
+        with breaker.guard():
+            raise ClientError(code)
+
+
+def test_opens_after_threshold_overload_errors():
+    breaker = CircuitBreaker("test", threshold=2, window_seconds=30, cooldown_seconds=30)
+    fail(breaker, "ValidationException")  # a bad request is not overload
+    fail(breaker)
+    assert breaker.snapshot()["state"] == "closed"
+    fail(breaker)
+    assert breaker.snapshot()["state"] == "open"
+
+    with pytest.raises(CircuitOpenError) as refused:
+        with breaker.guard():
+            pass
+    assert refused.value.retry_after >= 1
+
+
+def test_half_open_allows_one_probe():
+    breaker = CircuitBreaker("test", threshold=1, window_seconds=30, cooldown_seconds=0.05)
+    fail(breaker)
+    time.sleep(0.1)
+
+    breaker.check()  # the probe
+    assert breaker.snapshot()["state"] == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    # A failed probe opens the circuit again, a successful one closes it
+    breaker.record_failure(ClientError("ServiceUnavailableException"))
+    assert breaker.snapshot()["state"] == "open"
+    time.sleep(0.1)
+    with breaker.guard():
+        pass
+    assert breaker.snapshot()["state"] == "closed"
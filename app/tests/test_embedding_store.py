@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from embedding_store import CURRENT_FILE, EmbeddingStore
+
+TEXTS = {
+    "specs/a.json": ["alpha torque", "alpha power"],
+    "manuals/b.txt": ["bravo oil"],
+    "warnings/c.json": ["charlie light"],
+}
+
+
+class FakeEmbedder:
+    """Unit vectors keyed by the first letter of the text; records what was embedded"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), 4), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors[i, "abc".index(text[0])] = 1.0
+        return vectors
+
+
+def read_passages(path):
+    return [{"source": path, "text": text} for text in TEXTS[path]]
+
+
+def test_update_reembeds_only_changed_files(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "fake-model")
+    embed = FakeEmbedder()
+
+    first, changed = store.update(None, {path: "v1" for path in TEXTS}, read_passages, embed)
+    assert changed == 3
+    assert len(first.passages) == 4
+
+    TEXTS["manuals/b.txt"] = ["bravo oil", "bravo coolant"]
+    try:
+        second, changed = store.update(first, {"specs/a.json": "v1", "manuals/b.txt": "v2", "warnings/c.json": "v1"},
+                                       read_passages, embed)
+    finally:
+        TEXTS["manuals/b.txt"] = ["bravo oil"]
+    assert changed == 1
+    assert embed.calls[-1] == ["bravo oil", "bravo coolant"]
+    assert (tmp_path / CURRENT_FILE).read_text(encoding="utf-8") == second.path.name
+    assert store.load().path == second.path
+
+    # Unchanged rows were copied over and still score against their own texts
+    query = np.array([0, 0, 1, 0], dtype=np.float32)
+    assert second.passages[second.top(query, 1)[0]]["text"] == "charlie light"
+    # Readers holding the previous snapshot keep searching it
+    assert len(first.passages) == 4 and first.top(query, 1)
+
+
+def test_update_drops_deleted_files(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "fake-model", dtype="int8")
+    embed = FakeEmbedder()
+    first, _ = store.update(None, {path: "v1" for path in TEXTS}, read_passages, embed)
+
+    second, changed = store.update(first, {"specs/a.json": "v1"}, read_passages, embed)
+    assert changed == 0
+    assert len(embed.calls) == 1
+    assert set(second.files) == {"specs/a.json"}
+    assert [p["text"] for p in second.passages] == ["alpha torque", "alpha power"]
+    assert second.top(np.array([1, 0, 0, 0], dtype=np.float32), 5) == [0, 1]
+
+    # Only the new generation and the one readers may still use are kept
+    third, _ = store.update(second, {"specs/a.json": "v1"}, read_passages, embed)
+    assert sorted(p.name for p in tmp_path.glob("gen-*")) == sorted({second.path.name, third.path.name})
+
+
+def test_load_ignores_a_store_for_another_model(tmp_path):
+    EmbeddingStore(str(tmp_path), "fake-model").update(None, {"specs/a.json": "v1"}, read_passages, FakeEmbedder())
+    assert EmbeddingStore(str(tmp_path), "other-model").load() is None
+    assert EmbeddingStore(str(tmp_path), "fake-model", dtype="int8").load() is None
@@ -0,0 +1,41 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from fast_lookup import FastLookup
+
+WARNINGS = [
+    {"id": "oil_pressure", "keywords": ["oil", "oil pressure", "engine oil"], "name_en": "Low Oil Pressure",
+     "severity_level": 5, "urgency_level": 5, "drive_restriction": "Do not continue driving",
+     "description_en": "Engine oil pressure is critically low.", "action_en": "Stop immediately."},
+    {"id": "check_engine", "keywords": ["check engine", "engine"], "name_en": "Check Engine",
+     "severity_level": 3, "urgency_level": 2, "drive_restriction": "Drive with caution",
+     "description_en": "General engine or emissions fault.", "action_en": "Have the codes read soon."},
+]
+PRESSURES = {"Mazda_3_2016": {"front": "36 psi", "rear": "34 psi"}}
+
+
+def make_lookup(tmp_path):
+    (tmp_path / "warnings").mkdir()
+    (tmp_path / "warnings" / "warning_lights_full.json").write_text(json.dumps(WARNINGS), encoding="utf-8")
+    (tmp_path / "tire_pressure").mkdir()
+    (tmp_path / "tire_pressure" / "tire_pressures.json").write_text(json.dumps(PRESSURES), encoding="utf-8")
+    return FastLookup(str(tmp_path)).build()
+
+
+def test_warning_and_tire_questions_are_answered(tmp_path):
+    lookup = make_lookup(tmp_path)
+    assert lookup.answer("Why is my oil pressure light on?").startswith("Low Oil Pressure")
+    assert lookup.answer("What does the check engine light mean?").startswith("Check Engine")
+    assert lookup.answer("Tire pressure for a 2016 Mazda 3?") == \
+        "Recommended tire pressure for the 2016 Mazda 3: 36 psi front, 34 psi rear."
+
+
+def test_warning_questions_with_other_intent_fall_through(tmp_path):
+    lookup = make_lookup(tmp_path)
+    assert lookup.answer("The oil light is on, which oil does my 2020 Mazda 3 take and how do I top it up?") is None
+    assert lookup.answer("How do I reset the oil light?") is None
+    assert lookup.answer("Oil light is on, what oil type should I use?") is None
+    assert lookup.answer("What oil does a 2016 Mazda 3 take?") is None
@@ -0,0 +1,41 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from folder_index import FolderIndex
+
+
+class SlowListingS3:
+    """S3 stand-in whose listing pauses after its first page"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.first_page_done = threading.Event()
+        self.resume = threading.Event()
+
+    def get_paginator(self, operation: str):
+        return self
+
+    def paginate(self, Bucket):
+        yield {"Contents": [{"Key": key} for key in self.keys]}
+        self.first_page_done.set()
+        self.resume.wait(5)
+
+
+def test_keys_added_during_refresh_are_kept():
+    s3 = SlowListingS3(["manuals/Mazda/3/2016/manual.pdf"])
+    index = FolderIndex(s3, "bucket")
+    index.prefixes = {"manuals"}
+
+    refresher = threading.Thread(target=index.refresh)
+    refresher.start()
+    assert s3.first_page_done.wait(5)
+    index.add_key("specs/Toyota/Corolla/2018/specs.json")
+    s3.resume.set()
+    refresher.join(5)
+
+    assert "specs/Toyota/Corolla/2018" in index.folders()
+    assert "manuals/Mazda/3/2016" in index.folders()
+    assert index.added is None
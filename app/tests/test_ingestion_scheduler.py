@@ -0,0 +1,109 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from ingestion_scheduler import IngestionScheduler
+from local_provider import KeywordRetriever, LocalAgentClient
+
+
+class FlakyAgentClient(LocalAgentClient):
+    """Local agent client whose first start_ingestion_job calls fail"""
+
+    def __init__(self, retriever, failures: int):
+        super().__init__(retriever, ingestion_seconds=0)
+        self.failures = failures
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("ConflictException: an ingestion job is already running")
+        return super().start_ingestion_job(knowledgeBaseId, dataSourceId, **kwargs)
+
+
+class SlowAgentClient(LocalAgentClient):
+    """Local agent client whose start_ingestion_job blocks until released"""
+
+    def __init__(self, retriever):
+        super().__init__(retriever, ingestion_seconds=0)
+        self.release = threading.Event()
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId, **kwargs):
+        self.release.wait(5)
+        return super().start_ingestion_job(knowledgeBaseId, dataSourceId, **kwargs)
+
+
+def make_scheduler(agent_client, on_complete=None):
+    return IngestionScheduler(agent_client, "KB", "DS", debounce_seconds=0.05, poll_seconds=0.01,
+                              max_poll_seconds=0.05, on_complete=on_complete)
+
+
+def wait_settled(scheduler, timeout=5):
+    version, state = 0, scheduler.state()
+    while not scheduler.is_settled(state):
+        new_version, state = scheduler.wait_for_change(version, timeout)
+        assert new_version != version, f"scheduler stuck in {state}"
+        version = new_version
+    return state
+
+
+def test_failing_completion_hook_does_not_wedge_the_scheduler(tmp_path):
+    calls = []
+
+    def on_complete(job_id):
+        calls.append(job_id)
+        raise RuntimeError("local index refresh failed")
+
+    scheduler = make_scheduler(LocalAgentClient(KeywordRetriever(tmp_path), ingestion_seconds=0), on_complete)
+
+    scheduler.request(immediate=True)
+    first = wait_settled(scheduler)
+    assert first["status"] == "COMPLETE"
+    assert scheduler.current_job is None
+
+    # A later request still starts a new job instead of only queueing a follow-up
+    scheduler.request(immediate=True)
+    second = wait_settled(scheduler)
+    assert second["status"] == "COMPLETE"
+    assert second["jobId"] != first["jobId"]
+    assert calls == [first["jobId"], second["jobId"]]
+
+
+def test_failed_start_is_retried(tmp_path):
+    scheduler = make_scheduler(FlakyAgentClient(KeywordRetriever(tmp_path), failures=2))
+
+    state = scheduler.request(immediate=True)
+    assert state["status"] == "SCHEDULED"
+    assert "ConflictException" in state["error"]
+
+    state = wait_settled(scheduler)
+    assert state["status"] == "COMPLETE"
+    assert "error" not in state
+
+
+def test_slow_start_does_not_hold_the_lock(tmp_path):
+    client = SlowAgentClient(KeywordRetriever(tmp_path))
+    scheduler = make_scheduler(client)
+
+    starter = threading.Thread(target=scheduler.request, kwargs={"immediate": True})
+    starter.start()
+    _, state = scheduler.wait_for_change(0, timeout=5)
+    assert state["status"] == "STARTING"
+
+    # Other clients are answered while the AWS call is in flight, and a new request is queued
+    assert scheduler.request(immediate=True)["queued"] is True
+    assert not scheduler.is_settled(scheduler.state())
+
+    client.release.set()
+    starter.join(5)
+    first_job = scheduler.last_job
+    state = wait_settled(scheduler)
+    assert state["status"] == "COMPLETE"
+    assert state["jobId"] != first_job
+
+
+def test_idle_is_not_settled(tmp_path):
+    scheduler = make_scheduler(LocalAgentClient(KeywordRetriever(tmp_path), ingestion_seconds=0))
+    assert scheduler.state()["status"] == "IDLE"
+    assert not scheduler.is_settled(scheduler.state())
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from model_router import DEFAULT_ROUTES, ModelRouter
+
+
+def make_router():
+    return ModelRouter(DEFAULT_ROUTES, known_phrases=["oil pressure", "oil", "Torque", "Engine oil", "tpms"])
+
+
+def test_single_lookups_are_simple():
+    router = make_router()
+    assert router.classify("What is the torque of the 2016 Mazda 3?") == "simple"
+    assert router.classify("What does the oil pressure light mean?") == "simple"
+
+
+def test_short_questions_are_complex_without_lookup_intent():
+    router = make_router()
+    assert router.classify("how do I reset the TPMS on my 2019 Civic") == "complex"
+    assert router.classify("is my 2019 Civic a good car?") == "complex"
+    assert router.classify("The oil light is on, which oil does my Mazda 3 take and how do I top it up?") == "complex"
+    assert router.classify("What oil does it take? And the torque?") == "complex"
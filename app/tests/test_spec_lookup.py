@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from spec_lookup import SpecTable
+
+VEHICLE = {"make": "Mazda", "model": "3", "year": "2020"}
+ROWS = [
+    ("Engine", "Type", "SKYACTIV-G 2.5L"),
+    ("Engine", "Power", "186 hp"),
+    ("Engine", "Torque", "252 Nm"),
+    ("Engine", "Fuel type", "Regular unleaded"),
+    ("Fluids", "Engine oil", "0W-20 (4.5 L)"),
+    ("Fluids", "Coolant", "Mazda FL22"),
+    ("Tire pressure", "Front", "36 PSI"),
+    ("Tire pressure", "Rear", "36 PSI"),
+]
+
+
+def make_table(tmp_path):
+    columns = {"make": [], "model": [], "year": [], "section": [], "field": [], "value": []}
+    for section, field, value in ROWS:
+        for key, item in zip(columns, (VEHICLE["make"], VEHICLE["model"], VEHICLE["year"], section, field, value)):
+            columns[key].append(item)
+    path = tmp_path / "specs_table.json"
+    path.write_text(json.dumps(columns), encoding="utf-8")
+    return SpecTable(str(path)).load()
+
+
+def test_spec_questions_are_answered(tmp_path):
+    table = make_table(tmp_path)
+    assert table.answer("What is the torque of the 2020 Mazda 3?", VEHICLE) == "2020 Mazda 3: Torque: 252 Nm."
+    assert table.answer("What is the power of my Mazda 3", VEHICLE) == "2020 Mazda 3: Power: 186 hp."
+    assert table.answer("What is the engine type of the 2020 Mazda 3?", VEHICLE) == "2020 Mazda 3: Type: SKYACTIV-G 2.5L."
+    assert table.answer("What engine oil does the Mazda 3 take?", VEHICLE) == "2020 Mazda 3: Engine oil: 0W-20 (4.5 L)."
+    assert table.answer("What is the tire pressure?", VEHICLE) == "2020 Mazda 3: Front: 36 PSI; Rear: 36 PSI."
+
+
+def test_single_word_fields_need_spec_intent(tmp_path):
+    table = make_table(tmp_path)
+    assert table.answer("Does my 2020 Mazda 3 have power steering?", VEHICLE) is None
+    assert table.answer("What does power steering do on my Mazda 3?", VEHICLE) is None
+    assert table.answer("Is the torque converter covered on a Mazda 3?", VEHICLE) is None
+    assert table.answer("My Mazda 3 is leaking coolant", VEHICLE) is None
+    assert table.answer("Mazda 3 engine noise", VEHICLE) is None
+
+
+def test_ambiguous_and_procedural_questions_fall_through(tmp_path):
+    table = make_table(tmp_path)
+    assert table.answer("What type of oil does the 2020 Mazda 3 use?", VEHICLE) is None
+    assert table.answer("What is the engine type of oil for the Mazda 3?", VEHICLE) is None
+    assert table.answer("How do I check the engine oil?", VEHICLE) is None
+    assert table.answer("What is the torque?", {"make": "Mazda", "model": "3"}) is None
@@ -0,0 +1,38 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from vehicle_query import VehicleParser, in_scope, merge_vehicle
+
+
+def make_parser(tmp_path):
+    (tmp_path / "manuals" / "Mazda" / "3" / "2016").mkdir(parents=True)
+    (tmp_path / "specs" / "Toyota" / "Corolla").mkdir(parents=True)
+    (tmp_path / "manufacturers" / "Hyundai").mkdir(parents=True)
+    (tmp_path / "tire_pressure").mkdir()
+    (tmp_path / "tire_pressure" / "tire_pressures.json").write_text(
+        json.dumps({"Hyundai_i20_2019": {"front": "32 psi", "rear": "30 psi"}}), encoding="utf-8")
+    return VehicleParser(str(tmp_path)).build()
+
+
+def test_parse_vehicle(tmp_path):
+    parser = make_parser(tmp_path)
+    assert parser.parse("Oil capacity of my 2016 Mazda 3?") == {"make": "Mazda", "model": "3", "year": "2016"}
+    assert parser.parse("corolla torque") == {"make": "Toyota", "model": "Corolla", "year": None}
+    assert parser.parse("Hyundai i20 2019 tire pressure") == {"make": "Hyundai", "model": "i20", "year": "2019"}
+    # A bare number is not a model without its make
+    assert parser.parse("What does warning 3 mean?") == {"make": None, "model": None, "year": None}
+
+
+def test_scope_and_follow_up_vehicle():
+    vehicle = {"make": "Mazda", "model": "3", "year": "2016"}
+    assert in_scope("manuals/Mazda/3/2016/manual.pdf", vehicle)
+    assert in_scope("warnings/warning_lights_full.json", vehicle)
+    assert not in_scope("manuals/Mazda/3/2020/manual.pdf", vehicle)
+    assert not in_scope("specs/Toyota/Corolla/specs.json", vehicle)
+
+    assert merge_vehicle(vehicle, {"make": None, "model": None, "year": "2020"}) == dict(vehicle, year="2020")
+    assert merge_vehicle(vehicle, {"make": "Mazda", "model": "CX-5", "year": None}) == \
+        {"make": "Mazda", "model": "CX-5", "year": None}
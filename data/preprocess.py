@@ -0,0 +1,128 @@
+import re
+import json
+import shutil
+import argparse
+from pathlib import Path
+
+# Offline preprocessing, run before upload.py:
+#  1. Splits manuals and specs on section boundaries into compact chunk files,
+#     each with a Bedrock "<file>.metadata.json" sidecar (make/model/year/section).
+#  2. Compiles every spec file into one columnar lookup table
+#     (make, model, year, section, field, value) for exact-value answers.
+
+YEAR_RE = re.compile(r"(19[5-9]\d|20\d{2})")
+SECTIONED_CATEGORIES = ("manuals", "specs")
+
+
+def vehicle_from_path(relative: Path):
+    """manuals/<make>/<model>/<year>/file or specs/<make>/<model>/[<year>/]file_<year>_..."""
+    parts = relative.parts
+    make = parts[1] if len(parts) > 2 else None
+    model = parts[2] if len(parts) > 3 else None
+    year_match = YEAR_RE.search("/".join(parts[3:]))
+    return make, model, year_match.group(1) if year_match else None
+
+
+def is_heading(line: str):
+    line = line.strip()
+    return line.endswith(":") and not line.startswith("-") and len(line) <= 60
+
+
+def split_sections(text: str):
+    """Return (title, [(section, lines)]) split on "Heading:" lines"""
+    lines = text.strip().splitlines()
+    title = lines[0].strip() if lines else ""
+    sections = []
+    current, body = "Introduction", []
+    for line in lines[1:]:
+        if is_heading(line):
+            if any(l.strip() for l in body):
+                sections.append((current, body))
+            current, body = line.strip()[:-1], []
+        else:
+            body.append(line)
+    if any(l.strip() for l in body):
+        sections.append((current, body))
+    return title, sections
+
+
+def parse_fields(section: str, lines):
+    """"- key: value" bullets become (key, value); bare bullets become (section, text)"""
+    fields = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("-"):
+            continue
+        item = line[1:].strip()
+        key, sep, value = item.partition(":")
+        if sep and value.strip():
+            fields.append((key.strip(), value.strip()))
+        else:
+            fields.append((section, item))
+    return fields
+
+
+def slugify(text: str):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_") or "section"
+
+
+def write_chunk(out_dir: Path, stem: str, index: int, section: str, text: str, metadata: dict):
+    chunk_path = out_dir / f"{stem}__{index:02d}_{slugify(section)}.txt"
+    chunk_path.write_text(text, encoding="utf-8")
+    sidecar = {"metadataAttributes": {k: v for k, v in metadata.items() if v is not None}}
+    (out_dir / f"{chunk_path.name}.metadata.json").write_text(json.dumps(sidecar, indent=2), encoding="utf-8")
+
+
+def preprocess_kb(kb_folder: str, out_folder: str, table_path: str):
+    kb = Path(kb_folder).resolve()
+    out = Path(out_folder).resolve()
+    if out.exists():
+        shutil.rmtree(out)
+
+    table = {"make": [], "model": [], "year": [], "section": [], "field": [], "value": []}
+    chunk_count = 0
+
+    for path in sorted(kb.rglob("*")):
+        if not path.is_file():
+            continue
+        relative = path.relative_to(kb)
+        target = out / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        category = relative.parts[0]
+        if category not in SECTIONED_CATEGORIES or path.suffix != ".txt" or path.name == "README.txt":
+            shutil.copy2(path, target)
+            continue
+
+        make, model, year = vehicle_from_path(relative)
+        title, sections = split_sections(path.read_text(encoding="utf-8"))
+        for index, (section, lines) in enumerate(sections):
+            # Keep the document title in every chunk so each one is self-describing
+            body = "\n".join(lines).strip()
+            text = f"{title}\n\n{section}:\n{body}\n"
+            metadata = {"category": category, "make": make, "model": model, "year": year, "section": section}
+            write_chunk(target.parent, path.stem, index, section, text, metadata)
+            chunk_count += 1
+
+            if category == "specs":
+                for field, value in parse_fields(section, lines):
+                    for column, cell in zip(table, (make, model, year, section, field, value)):
+                        table[column].append(cell)
+
+    table_file = Path(table_path)
+    table_file.parent.mkdir(parents=True, exist_ok=True)
+    table_file.write_text(json.dumps(table, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    print(f"Wrote {chunk_count} section chunks to {out}")
+    print(f"Wrote {len(table['field'])} spec rows to {table_file}")
+
+
+# === Usage ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Section-chunk the KB and compile the spec lookup table")
+    parser.add_argument("--folder", default="knowledge_base")
+    parser.add_argument("--out", default="build/knowledge_base")
+    parser.add_argument("--table", default="build/specs_table.json")
+    args = parser.parse_args()
+
+    preprocess_kb(args.folder, args.out, args.table)
@@ -1,7 +1,7 @@
-import os
 import json
 from pathlib import Path
-import boto3
+
+from upload import upload_folder_to_s3
 
 
 def write_readme(path: Path, text: str):
@@ -51,19 +51,8 @@ def create_tire_pressure_files(base_path: str):
 
 
 def upload_tire_pressure_to_s3(local_folder: str, bucket: str):
-    s3_client = boto3.client("s3")
-
-    local_path = Path(local_folder).resolve()
-    bucket_prefix = "KB/tire_pressure"
-
-    for root, dirs, files in os.walk(local_path):
-        for file in files:
-            full_local = Path(root) / file
-            relative = full_local.relative_to(local_path)
-            s3_key = f"{bucket_prefix}/{relative.as_posix()}"
-
-            s3_client.upload_file(str(full_local), bucket, s3_key)
-            print(f"Uploaded: {full_local} → s3://{bucket}/{s3_key}")
+    # Same incremental, parallel sync as the full KB push, scoped to the tire_pressure prefix
+    upload_folder_to_s3(local_folder, bucket, "KB/tire_pressure")
 
 
 # === RUN ===
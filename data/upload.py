@@ -1,32 +1,152 @@
 import boto3
 import os
+import json
+import hashlib
+import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def upload_folder_to_s3(local_folder: str, bucket_name: str, s3_prefix: str):
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+# Files above MULTIPART_THRESHOLD are uploaded in MULTIPART_CHUNKSIZE parts.
+# The same values are used to predict the S3 ETag of a local file.
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+# Keys this tool has synced, per bucket. Only these are ever deleted, so objects
+# added by others (e.g. manuals uploaded through the web UI) are left alone.
+MANIFEST_PATH = Path(__file__).resolve().parent / ".upload_manifest.json"
+
+
+def make_s3_client(max_workers: int):
+    """One client shared by every upload thread, with a pool large enough for all of them"""
+    return boto3.client("s3", config=Config(max_pool_connections=max_workers * 2))
+
+
+def local_etag(path: Path):
     """
-    Uploads an entire folder (with subdirectories) to an S3 bucket.
-    Preserves the folder structure under the given S3 prefix.
+    Compute the ETag S3 reports for this file when uploaded with our TransferConfig:
+    plain MD5 for single-part uploads, MD5-of-part-MD5s plus "-<parts>" for multipart.
+    (Buckets using SSE-KMS return non-MD5 ETags; those files are always re-uploaded.)
     """
+    size = path.stat().st_size
+    part_digests = []
+    with open(path, "rb") as f:
+        if size < MULTIPART_THRESHOLD:
+            return hashlib.md5(f.read()).hexdigest()
+        for chunk in iter(lambda: f.read(MULTIPART_CHUNKSIZE), b""):
+            part_digests.append(hashlib.md5(chunk).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
 
-    s3_client = boto3.client("s3")
-    local_folder_path = Path(local_folder).resolve()
 
+def list_remote_etags(s3_client, bucket_name: str, s3_prefix: str):
+    """Return {key: etag} for every object under the prefix"""
+    remote = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=f"{s3_prefix}/"):
+        for obj in page.get("Contents", []):
+            remote[obj["Key"]] = obj["ETag"].strip('"')
+    return remote
+
+
+def list_local_files(local_folder_path: Path, s3_prefix: str):
+    """Return {s3_key: local_path} preserving the folder structure under the prefix"""
+    local = {}
     for root, dirs, files in os.walk(local_folder_path):
         for file in files:
             full_local_path = Path(root) / file
-
-            # Compute the S3 path while preserving folder structure
             relative_path = full_local_path.relative_to(local_folder_path)
-            s3_path = f"{s3_prefix}/{relative_path.as_posix()}"
+            local[f"{s3_prefix}/{relative_path.as_posix()}"] = full_local_path
+    return local
+
+
+def load_manifest(manifest_path: Path, bucket_name: str):
+    """Set of keys previously synced to the bucket by this tool"""
+    if not manifest_path.exists():
+        return set()
+    return set(json.loads(manifest_path.read_text(encoding="utf-8")).get(bucket_name, []))
+
+
+def save_manifest(manifest_path: Path, bucket_name: str, keys):
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    manifest[bucket_name] = sorted(keys)
+    manifest_path.write_text(json.dumps(manifest, indent=1) + "\n", encoding="utf-8")
+
+
+def upload_folder_to_s3(local_folder: str, bucket_name: str, s3_prefix: str,
+                        max_workers: int = 16, delete: bool = False, dry_run: bool = False, s3_client=None,
+                        manifest_path: Path = MANIFEST_PATH):
+    """
+    Syncs an entire folder (with subdirectories) to an S3 bucket.
+    Preserves the folder structure under the given S3 prefix and uploads only new or
+    changed files (local hash vs S3 ETag) on a thread pool. With delete=True, remote
+    objects that this tool synced earlier (per the manifest) and that no longer exist
+    locally are deleted; objects it never synced are never touched.
+    """
+
+    s3_client = s3_client or make_s3_client(max_workers)
+    transfer_config = TransferConfig(
+        multipart_threshold=MULTIPART_THRESHOLD,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        use_threads=False  # parallelism comes from the per-file pool below
+    )
+    local_folder_path = Path(local_folder).resolve()
+    s3_prefix = s3_prefix.strip("/")
+
+    local = list_local_files(local_folder_path, s3_prefix)
+    remote = list_remote_etags(s3_client, bucket_name, s3_prefix)
+
+    to_upload = [key for key, path in local.items() if remote.get(key) != local_etag(path)]
+    synced = load_manifest(manifest_path, bucket_name)
+    to_delete = sorted((set(remote) - set(local)) & synced) if delete else []
+
+    print(f"{len(local)} local files: {len(to_upload)} to upload, "
+          f"{len(local) - len(to_upload)} unchanged, {len(to_delete)} to delete")
+    if dry_run:
+        for key in to_upload:
+            print(f"Would upload: {local[key]} → s3://{bucket_name}/{key}")
+        for key in to_delete:
+            print(f"Would delete: s3://{bucket_name}/{key}")
+        return {"uploaded": [], "deleted": [], "unchanged": len(local) - len(to_upload)}
+
+    def upload_one(key):
+        s3_client.upload_file(str(local[key]), bucket_name, key, Config=transfer_config)
+        return key
+
+    uploaded = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(upload_one, key) for key in to_upload]
+        for future in as_completed(futures):
+            key = future.result()
+            uploaded.append(key)
+            print(f"Uploaded: {local[key]} → s3://{bucket_name}/{key}")
 
-            s3_client.upload_file(str(full_local_path), bucket_name, s3_path)
+    # delete_objects accepts at most 1000 keys per call
+    for i in range(0, len(to_delete), 1000):
+        batch = to_delete[i:i + 1000]
+        s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+        )
+        for key in batch:
+            print(f"Deleted: s3://{bucket_name}/{key}")
 
-            print(f"Uploaded: {full_local_path} → s3://{bucket_name}/{s3_path}")
+    # Failed uploads raised above, so every local key is now in the bucket
+    save_manifest(manifest_path, bucket_name, (synced | set(local)) - set(to_delete))
+    return {"uploaded": uploaded, "deleted": to_delete, "unchanged": len(local) - len(to_upload)}
 
 
 # === Usage ===
-local_kb_folder = "knowledge_base"
-bucket_name = "aicourse-lesson7-clay227"
-s3_prefix = "KB"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the local knowledge base folder to S3")
+    parser.add_argument("--folder", default="knowledge_base")
+    parser.add_argument("--bucket", default="aicourse-lesson7-clay227")
+    parser.add_argument("--prefix", default="KB")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--delete", action="store_true",
+                        help="delete remote objects this tool synced earlier that no longer exist locally")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
 
-upload_folder_to_s3(local_kb_folder, bucket_name, s3_prefix)
+    upload_folder_to_s3(args.folder, args.bucket, args.prefix,
+                        max_workers=args.workers, delete=args.delete, dry_run=args.dry_run)